@@ -0,0 +1,393 @@
+"""Caches for Waze lookups."""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable, Iterator, Mapping
+from os import PathLike
+from typing import Any, Generic, Protocol, TypeVar
+
+from pywaze.route_calculator import BaseCoords, Coords
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+GeocodeKey = tuple[str, str, float, float]
+RouteKey = tuple[Hashable, ...]
+
+
+class LRUTTLCache(Generic[K, V]):
+    """Size bounded LRU cache with a per entry time to live."""
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 3600,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be greater than 0")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of stored entries, including expired ones."""
+        return len(self._entries)
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.clock() - stored_at > self.ttl
+
+    def _lookup(self, key: K) -> V | None:
+        """Return a fresh value without touching the counters."""
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if self._expired(stored_at):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _count(self, value: V | None) -> V | None:
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def get(self, key: K) -> V | None:
+        """Return the cached value or None if missing or expired."""
+        return self._count(self._lookup(key))
+
+    def set(self, key: K, value: V) -> None:
+        """Store a value and evict the least recently used entries."""
+        self._store(key, value, self.clock())
+
+    def _store(self, key: K, value: V, stored_at: float) -> None:
+        self._entries[key] = (stored_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def age(self, key: K) -> float | None:
+        """Return the seconds since the entry was stored or None if missing."""
+
+        entry = self._entries.get(key)
+        return self.clock() - entry[0] if entry is not None else None
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        """Return the share of lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class GeocodeStore(Protocol):
+    """Persistent backend for geocode results."""
+
+    def get(self, key: GeocodeKey) -> Coords | None:
+        """Return the stored coordinates or None if missing or expired."""
+
+    def get_entry(self, key: GeocodeKey) -> tuple[Coords, float] | None:
+        """Return the stored coordinates and the seconds until they expire."""
+
+    def set(self, key: GeocodeKey, value: Coords) -> None:
+        """Persist the coordinates."""
+
+    def items(self) -> Iterator[tuple[GeocodeKey, Coords]]:
+        """Iterate over all entries which are not expired."""
+
+    def entries(self) -> Iterator[tuple[GeocodeKey, Coords, float]]:
+        """Iterate over all entries which are not expired and their time left."""
+
+
+class SQLiteGeocodeStore:
+    """Geocode results persisted in a SQLite database file.
+
+    The connection may be used from any thread, one call at a time.
+    """
+
+    def __init__(
+        self,
+        path: str | PathLike[str],
+        ttl: float = 30 * 86400,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+
+    def _oldest_valid(self) -> float:
+        return self.clock() - self.ttl
+
+    def get(self, key: GeocodeKey) -> Coords | None:
+        """Return the stored coordinates or None if missing or expired."""
+
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: GeocodeKey) -> tuple[Coords, float] | None:
+        """Return the stored coordinates and the seconds until they expire."""
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, stored_at FROM geocode WHERE key = ? AND stored_at >= ?",
+                (_dump_key(key), self._oldest_valid()),
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), self._expires_in(row[1])
+
+    def _expires_in(self, stored_at: float) -> float:
+        return stored_at + self.ttl - self.clock()
+
+    def set(self, key: GeocodeKey, value: Coords) -> None:
+        """Persist the coordinates."""
+        self.set_many([(key, value)])
+
+    def set_many(self, items: Iterable[tuple[GeocodeKey, Coords]]) -> None:
+        """Persist many entries in a single transaction."""
+
+        stored_at = self.clock()
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO geocode (key, value, stored_at) VALUES (?, ?, ?)",
+                (
+                    (_dump_key(key), json.dumps(value), stored_at)
+                    for key, value in items
+                ),
+            )
+
+    def items(self) -> Iterator[tuple[GeocodeKey, Coords]]:
+        """Iterate over all entries which are not expired."""
+
+        for key, value, _ in self.entries():
+            yield key, value
+
+    def entries(self) -> Iterator[tuple[GeocodeKey, Coords, float]]:
+        """Iterate over all entries which are not expired and their time left."""
+
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT key, value, stored_at FROM geocode WHERE stored_at >= ? "
+                "ORDER BY stored_at",
+                (self._oldest_valid(),),
+            ).fetchall()
+        for key, value, stored_at in rows:
+            yield _load_key(key), json.loads(value), self._expires_in(stored_at)
+
+    def expire(self) -> int:
+        """Delete expired entries and return how many were removed."""
+
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "DELETE FROM geocode WHERE stored_at < ?", (self._oldest_valid(),)
+            )
+        return cursor.rowcount
+
+    def compact(self) -> int:
+        """Delete expired entries and shrink the database file."""
+
+        removed = self.expire()
+        with self._lock:
+            self._connection.execute("VACUUM")
+        return removed
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
+
+
+class GeocodeCache(LRUTTLCache[GeocodeKey, Coords]):
+    """Cache for address_to_coords results.
+
+    With a store, misses fall through to it and new entries are written
+    through to it, so results survive restarts. Entries read from the store
+    expire in memory no later than in the store. aget, aset and awarm_up do
+    the store I/O in a worker thread so the event loop is not blocked.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 86400,
+        precision: int = 3,
+        clock: Callable[[], float] = time.monotonic,
+        store: GeocodeStore | None = None,
+    ):
+        super().__init__(maxsize=maxsize, ttl=ttl, clock=clock)
+        self.precision = precision
+        self.store = store
+
+    def make_key(
+        self, region: str, address: str, base_coords: BaseCoords
+    ) -> GeocodeKey:
+        """Build the cache key for an address lookup."""
+
+        return (
+            region,
+            " ".join(address.split()).casefold(),
+            round(base_coords["lat"], self.precision),
+            round(base_coords["lon"], self.precision),
+        )
+
+    def get(self, key: GeocodeKey) -> Coords | None:
+        """Return a copy of the cached coordinates."""
+
+        coords = self._lookup(key)
+        if coords is None and self.store is not None:
+            coords = self._load(key, self.store.get_entry(key))
+        self._count(coords)
+        return _copy_coords(coords) if coords is not None else None
+
+    async def aget(self, key: GeocodeKey) -> Coords | None:
+        """Return a copy of the cached coordinates, reading the store in a thread."""
+
+        coords = self._lookup(key)
+        if coords is None and self.store is not None:
+            entry = await asyncio.to_thread(self.store.get_entry, key)
+            coords = self._load(key, entry)
+        self._count(coords)
+        return _copy_coords(coords) if coords is not None else None
+
+    def set(self, key: GeocodeKey, value: Coords) -> None:
+        """Store a copy of the coordinates."""
+
+        super().set(key, _copy_coords(value))
+        if self.store is not None:
+            self.store.set(key, value)
+
+    async def aset(self, key: GeocodeKey, value: Coords) -> None:
+        """Store a copy of the coordinates, writing the store in a thread."""
+
+        super().set(key, _copy_coords(value))
+        if self.store is not None:
+            await asyncio.to_thread(self.store.set, key, _copy_coords(value))
+
+    def _load(
+        self, key: GeocodeKey, entry: tuple[Coords, float] | None
+    ) -> Coords | None:
+        """Keep an entry read from the store until the earlier of both expiries."""
+
+        if entry is None:
+            return None
+        coords, expires_in = entry
+        self._store(key, coords, self.clock() - max(0.0, self.ttl - expires_in))
+        return coords
+
+    def warm_up(self) -> int:
+        """Load the most recent entries of the store into memory."""
+
+        if self.store is None:
+            return 0
+        return self._warm_up(list(self.store.entries()))
+
+    async def awarm_up(self) -> int:
+        """Load the most recent entries of the store, reading it in a thread."""
+
+        if self.store is None:
+            return 0
+        store = self.store
+        return self._warm_up(await asyncio.to_thread(lambda: list(store.entries())))
+
+    def _warm_up(self, entries: list[tuple[GeocodeKey, Coords, float]]) -> int:
+        for key, coords, expires_in in entries:
+            self._load(key, (coords, expires_in))
+        return min(len(entries), self.maxsize)
+
+
+class RouteCache(LRUTTLCache[RouteKey, list[dict[str, Any]]]):
+    """Cache for get_routes results.
+
+    Keys contain the rounded start and end coordinates, every routing option
+    and the time bucket of the departure. Entries are served while they are
+    younger than max_age seconds. Every caller gets its own copy of the list;
+    the route dicts in it are shared and must not be modified.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        max_age: float = 120,
+        bucket_seconds: float = 300,
+        precision: int = 4,
+        clock: Callable[[], float] = time.time,
+    ):
+        super().__init__(maxsize=maxsize, ttl=max_age, clock=clock)
+        self.bucket_seconds = bucket_seconds
+        self.precision = precision
+
+    @property
+    def max_age(self) -> float:
+        """Return the freshness window in seconds."""
+        return self.ttl
+
+    def get(self, key: RouteKey) -> list[dict[str, Any]] | None:
+        """Return a copy of the cached list of routes."""
+
+        routes = super().get(key)
+        return list(routes) if routes is not None else None
+
+    def set(self, key: RouteKey, value: list[dict[str, Any]]) -> None:
+        """Store a copy of the list of routes."""
+        super().set(key, list(value))
+
+    def make_key(
+        self,
+        routing_server: str,
+        start: BaseCoords,
+        end: BaseCoords,
+        options: Mapping[str, Hashable],
+        time_delta: int = 0,
+    ) -> RouteKey:
+        """Build the cache key for a routing request."""
+
+        departure = self.clock() + time_delta * 60
+        return (
+            routing_server,
+            round(start["lat"], self.precision),
+            round(start["lon"], self.precision),
+            round(end["lat"], self.precision),
+            round(end["lon"], self.precision),
+            int(departure // self.bucket_seconds),
+            *sorted(options.items()),
+        )
+
+
+def _copy_coords(coords: Coords) -> Coords:
+    return {
+        "lat": coords["lat"],
+        "lon": coords["lon"],
+        "bounds": dict(coords["bounds"]),
+    }
+
+
+def _dump_key(key: GeocodeKey) -> str:
+    return json.dumps(key, ensure_ascii=False)
+
+
+def _load_key(key: str) -> GeocodeKey:
+    region, address, lat, lon = json.loads(key)
+    return (region, address, lat, lon)
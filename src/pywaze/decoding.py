@@ -0,0 +1,173 @@
+"""JSON decoding of Waze responses."""
+
+import json
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, TypedDict
+
+JSONLoads = Callable[[bytes], Any]
+
+
+class _Path(TypedDict, total=False):
+    segmentId: int
+    x: float
+    y: float
+
+
+class _Segment(TypedDict, total=False):
+    path: _Path | None
+    length: float
+    crossTime: float
+    crossTimeWithoutRealTime: float
+    cross_time: float
+    cross_time_without_real_time: float
+    roadType: int
+    isToll: bool
+
+
+class _Route(TypedDict, total=False):
+    results: list[_Segment]
+    result: list[_Segment]
+    routeName: str | None
+    streetNames: list[str | None] | None
+
+
+class _Alternative(TypedDict, total=False):
+    response: _Route
+    coords: list[_Path]
+
+
+class _RoutingResponse(TypedDict, total=False):
+    alternatives: list[_Alternative]
+    response: _Route | list[_Route]
+    coords: list[_Path]
+    error: Any
+
+
+def default_loads() -> JSONLoads:
+    """Return orjson.loads if orjson is installed, else json.loads."""
+
+    try:
+        import orjson
+    except ImportError:
+        return json.loads
+    loads: JSONLoads = orjson.loads
+    return loads
+
+
+def partial_routing_loads(
+    on_fallback: Callable[[], None] | None = None,
+) -> JSONLoads | None:
+    """Return a msgspec decoder for the routing response fields pywaze uses.
+
+    Other fields, like instructions, lanes and areas, are skipped without
+    building Python objects for them. Responses not matching the schema are
+    decoded in full and reported to on_fallback. Returns None if msgspec is not
+    installed.
+    """
+
+    try:
+        import msgspec
+    except ImportError:
+        return None
+
+    decoder = msgspec.json.Decoder(_RoutingResponse)
+
+    def loads(content: bytes) -> Any:
+        try:
+            return decoder.decode(content)
+        except msgspec.ValidationError:
+            # Unexpected types somewhere in the response, keep everything.
+            if on_fallback is not None:
+                on_fallback()
+            return msgspec.json.decode(content)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+    return loads
+
+
+@dataclass
+class DecodeStats:
+    """Counters of decoded responses."""
+
+    responses: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+    peak_allocated: int = 0
+    """Largest memory peak of a single decode, only with measure_allocations."""
+    fallbacks: int = 0
+    """Partially decoded routing responses that had to be decoded in full."""
+
+    @property
+    def mean_seconds(self) -> float:
+        """Return the mean decode time per response."""
+        return self.seconds / self.responses if self.responses else 0.0
+
+
+class JSONDecoder:
+    """Decode response bodies and keep decode statistics.
+
+    loads must raise ValueError for invalid input. With partial_routes and
+    msgspec installed, routing responses only contain the fields pywaze uses.
+    With measure_allocations the memory peak of every decode is traced, which
+    slows decoding down.
+    """
+
+    def __init__(
+        self,
+        loads: JSONLoads | None = None,
+        measure_allocations: bool = False,
+        partial_routes: bool = False,
+    ):
+        self.loads = loads or default_loads()
+        self.stats = DecodeStats()
+        self.routing_loads = (
+            partial_routing_loads(self._count_fallback) if partial_routes else None
+        ) or self.loads
+        self.measure_allocations = measure_allocations
+
+    def decode(self, content: bytes) -> Any:
+        """Decode a JSON document."""
+        return self._decode(content, self.loads)
+
+    def decode_routing(self, content: bytes) -> Any:
+        """Decode a routing response."""
+        return self._decode(content, self.routing_loads)
+
+    def _decode(self, content: bytes, loads: JSONLoads) -> Any:
+        if self.measure_allocations:
+            return self._decode_traced(content, loads)
+        started = time.perf_counter()
+        try:
+            return loads(content)
+        finally:
+            self._count(content, time.perf_counter() - started)
+
+    def _decode_traced(self, content: bytes, loads: JSONLoads) -> Any:
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        started_size, _ = tracemalloc.get_traced_memory()
+        started = time.perf_counter()
+        try:
+            return loads(content)
+        finally:
+            self._count(content, time.perf_counter() - started)
+            _, peak = tracemalloc.get_traced_memory()
+            self.stats.peak_allocated = max(
+                self.stats.peak_allocated, peak - started_size
+            )
+            if not tracing:
+                tracemalloc.stop()
+
+    def _count_fallback(self) -> None:
+        self.stats.fallbacks += 1
+
+    def _count(self, content: bytes, seconds: float) -> None:
+        self.stats.responses += 1
+        self.stats.bytes += len(content)
+        self.stats.seconds += seconds
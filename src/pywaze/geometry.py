@@ -0,0 +1,133 @@
+"""Route geometries."""
+
+from array import array
+from collections.abc import Iterator
+from typing import Any
+
+
+class RouteGeometry:
+    """The points of a route as arrays of latitudes and longitudes."""
+
+    __slots__ = ("lats", "lons")
+
+    def __init__(self, lats: "array[float]", lons: "array[float]"):
+        if len(lats) != len(lons):
+            raise ValueError("lats and lons must have the same length")
+        self.lats = lats
+        self.lons = lons
+
+    @classmethod
+    def from_route(cls, route: dict[str, Any]) -> "RouteGeometry":
+        """Read the geometry of a route.
+
+        Uses the full coordinates list if the response has one, else the path
+        point of every segment.
+        """
+
+        lats = array("d")
+        lons = array("d")
+        coords = route.get("coords")
+        if coords:
+            for point in coords:
+                lats.append(point["y"])
+                lons.append(point["x"])
+        else:
+            for segment in route.get("results") or route.get("result") or ():
+                path = segment.get("path")
+                if path:
+                    lats.append(path["y"])
+                    lons.append(path["x"])
+        return cls(lats, lons)
+
+    def __len__(self) -> int:
+        """Return the number of points."""
+        return len(self.lats)
+
+    def __iter__(self) -> Iterator[tuple[float, float]]:
+        """Iterate over the points as (lat, lon) pairs."""
+        return zip(self.lats, self.lons, strict=True)
+
+    def simplify(self, tolerance: float) -> "RouteGeometry":
+        """Return the geometry simplified with the Douglas-Peucker algorithm.
+
+        Points closer than tolerance degrees to the simplified line are dropped.
+        """
+
+        keep = _douglas_peucker(self.lats, self.lons, tolerance)
+        return RouteGeometry(
+            array("d", (lat for lat, kept in zip(self.lats, keep) if kept)),
+            array("d", (lon for lon, kept in zip(self.lons, keep) if kept)),
+        )
+
+    def encode(self, precision: int = 5) -> str:
+        """Return the geometry as an encoded polyline."""
+        return encode_polyline(self.lats, self.lons, precision)
+
+
+def encode_polyline(
+    lats: "array[float]", lons: "array[float]", precision: int = 5
+) -> str:
+    """Encode points with the Google encoded polyline algorithm."""
+
+    factor = 10**precision
+    chunks: list[str] = []
+    previous_lat = previous_lon = 0
+    for lat, lon in zip(lats, lons, strict=True):
+        scaled_lat = round(lat * factor)
+        scaled_lon = round(lon * factor)
+        _encode_value(scaled_lat - previous_lat, chunks)
+        _encode_value(scaled_lon - previous_lon, chunks)
+        previous_lat, previous_lon = scaled_lat, scaled_lon
+    return "".join(chunks)
+
+
+def _encode_value(value: int, chunks: list[str]) -> None:
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+        value >>= 5
+    chunks.append(chr(value + 63))
+
+
+def _douglas_peucker(
+    lats: "array[float]", lons: "array[float]", tolerance: float
+) -> bytearray:
+    keep = bytearray(len(lats))
+    if len(lats) < 3:
+        return bytearray(b"\x01" * len(lats))
+    keep[0] = keep[-1] = 1
+    max_distance = tolerance * tolerance
+    stack = [(0, len(lats) - 1)]
+    while stack:
+        first, last = stack.pop()
+        farthest = first
+        farthest_distance = max_distance
+        for index in range(first + 1, last):
+            distance = _squared_segment_distance(
+                lons[index],
+                lats[index],
+                lons[first],
+                lats[first],
+                lons[last],
+                lats[last],
+            )
+            if distance > farthest_distance:
+                farthest = index
+                farthest_distance = distance
+        if farthest != first:
+            keep[farthest] = 1
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+    return keep
+
+
+def _squared_segment_distance(
+    x: float, y: float, x1: float, y1: float, x2: float, y2: float
+) -> float:
+    dx = x2 - x1
+    dy = y2 - y1
+    if dx or dy:
+        t = max(0.0, min(1.0, ((x - x1) * dx + (y - y1) * dy) / (dx * dx + dy * dy)))
+        x1 += t * dx
+        y1 += t * dy
+    return (x - x1) ** 2 + (y - y1) ** 2
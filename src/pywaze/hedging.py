@@ -0,0 +1,90 @@
+"""Hedged requests to cut tail latency."""
+
+import asyncio
+import contextlib
+import math
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+class HedgePolicy:
+    """Send a second request when the first is slower than a latency percentile.
+
+    The hedge delay is the given percentile of the last window latencies, or
+    initial_delay until min_samples latencies were seen. At most max_ratio of
+    the requests are hedged. Whichever request answers first wins and the
+    other one is cancelled.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        initial_delay: float = 1.0,
+        min_delay: float = 0.05,
+        max_ratio: float = 0.1,
+        window: int = 200,
+        min_samples: int = 20,
+    ):
+        if not 0 < percentile <= 1:
+            raise ValueError("percentile must be in (0, 1]")
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._latencies: deque[float] = deque(maxlen=window)
+
+    def delay(self) -> float:
+        """Return the seconds to wait before sending a hedge."""
+
+        if len(self._latencies) < self.min_samples:
+            return self.initial_delay
+        latencies = sorted(self._latencies)
+        index = math.ceil(self.percentile * len(latencies)) - 1
+        return max(self.min_delay, latencies[index])
+
+    def record(self, latency: float) -> None:
+        """Record the latency of a successful request."""
+        self._latencies.append(latency)
+
+    def _may_hedge(self) -> bool:
+        return self.hedges + 1 <= self.max_ratio * self.requests
+
+    async def call(self, func: Callable[[], Awaitable[T]]) -> T:
+        """Call func and hedge it with a second call if it is too slow."""
+
+        self.requests += 1
+        started = time.monotonic()
+        primary = asyncio.ensure_future(func())
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.delay())
+            if not done and self._may_hedge():
+                self.hedges += 1
+                tasks.add(asyncio.ensure_future(func()))
+            while True:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if task.exception() is None), None)
+                if winner is not None or len(done) == len(tasks):
+                    break
+                tasks -= done
+            if winner is None:
+                # Every request failed, raise the error of the primary request.
+                return primary.result()
+            if winner is not primary:
+                self.hedge_wins += 1
+            self.record(time.monotonic() - started)
+            return winner.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                    with contextlib.suppress(asyncio.CancelledError):
+                        await task
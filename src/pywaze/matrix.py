@@ -0,0 +1,78 @@
+"""Travel time and distance matrices."""
+
+import math
+from array import array
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from pywaze.route_calculator import Location
+
+
+@dataclass(frozen=True)
+class RouteMatrix:
+    """Durations in minutes and distances in kilometers between origins and destinations.
+
+    Values are stored row major, one row per origin. Cells without a route are NaN
+    and the reason is kept in errors.
+    """
+
+    origins: "list[Location]"
+    destinations: "list[Location]"
+    durations: "array[float]" = field(repr=False)
+    distances: "array[float]" = field(repr=False)
+    errors: dict[tuple[int, int], Exception] = field(default_factory=dict)
+
+    @classmethod
+    def empty(
+        cls, origins: "list[Location]", destinations: "list[Location]"
+    ) -> "RouteMatrix":
+        """Create a matrix with every cell set to NaN."""
+
+        size = len(origins) * len(destinations)
+        return cls(
+            origins=origins,
+            destinations=destinations,
+            durations=array("d", [math.nan]) * size,
+            distances=array("d", [math.nan]) * size,
+        )
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        """Return the number of origins and destinations."""
+        return len(self.origins), len(self.destinations)
+
+    def _index(self, origin: int, destination: int) -> int:
+        if not 0 <= destination < len(self.destinations):
+            raise IndexError("destination index out of range")
+        return origin * len(self.destinations) + destination
+
+    def set(
+        self, origin: int, destination: int, duration: float, distance: float
+    ) -> None:
+        """Set the values of a cell."""
+
+        index = self._index(origin, destination)
+        self.durations[index] = duration
+        self.distances[index] = distance
+
+    def duration(self, origin: int, destination: int) -> float:
+        """Return the duration of a cell."""
+        return self.durations[self._index(origin, destination)]
+
+    def distance(self, origin: int, destination: int) -> float:
+        """Return the distance of a cell."""
+        return self.distances[self._index(origin, destination)]
+
+    def to_numpy(self) -> tuple[Any, Any]:
+        """Return durations and distances as 2D NumPy arrays.
+
+        Requires the optional numpy dependency.
+        """
+
+        import numpy as np
+
+        return (
+            np.frombuffer(self.durations, dtype=np.float64).reshape(self.shape),
+            np.frombuffer(self.distances, dtype=np.float64).reshape(self.shape),
+        )
@@ -0,0 +1,83 @@
+"""Client side rate limiting of Waze requests."""
+
+import asyncio
+import time
+from collections.abc import Callable
+
+
+class TokenBucket:
+    """Token bucket refilled with rate tokens per second up to capacity.
+
+    Callers reserve their tokens immediately and sleep off the deficit, so
+    waiting callers are served in order.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Return the seconds a caller acquiring tokens now would have to wait."""
+
+        self._refill()
+        return max(0.0, (tokens - self._tokens) / self.rate)
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens, waiting until they are available. Returns the seconds waited."""
+
+        wait = self.wait_time(tokens)
+        self._tokens -= tokens
+        if wait:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self._tokens += tokens
+                raise
+        return wait
+
+
+class RateLimiter:
+    """Separate token buckets for the search and routing servers.
+
+    Share one instance between calculators to enforce a process wide budget.
+    """
+
+    def __init__(
+        self,
+        search: TokenBucket | None = None,
+        routing: TokenBucket | None = None,
+    ):
+        self.buckets: dict[str, TokenBucket] = {}
+        if search is not None:
+            self.buckets["search"] = search
+        if routing is not None:
+            self.buckets["routing"] = routing
+
+    def wait_time(self, endpoint: str) -> float:
+        """Return the seconds a request to endpoint would have to wait now."""
+
+        bucket = self.buckets.get(endpoint)
+        return bucket.wait_time() if bucket is not None else 0.0
+
+    async def acquire(self, endpoint: str) -> float:
+        """Wait for a request slot for endpoint. Returns the seconds waited."""
+
+        bucket = self.buckets.get(endpoint)
+        return await bucket.acquire() if bucket is not None else 0.0
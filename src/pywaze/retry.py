@@ -0,0 +1,80 @@
+"""Retrying of transient Waze request failures."""
+
+import asyncio
+import random
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import TypeVar
+
+import httpx
+
+from pywaze.route_calculator import WRCServerError, WRCTimeoutError
+
+T = TypeVar("T")
+
+
+@dataclass
+class RetryPolicy:
+    """Retry with exponential backoff and jitter.
+
+    The delay before retry n is backoff_base * 2 ** (n - 1), capped at
+    backoff_max and reduced by a random share of up to jitter. An attempt still
+    running at deadline seconds is cancelled with WRCTimeoutError, and no retry
+    is started once the total time would exceed the deadline.
+    """
+
+    max_attempts: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 10.0
+    jitter: float = 1.0
+    deadline: float | None = None
+    retry_on: tuple[type[Exception], ...] = (
+        WRCTimeoutError,
+        WRCServerError,
+        httpx.TransportError,
+    )
+    attempts: Counter[tuple[str, int]] = field(default_factory=Counter)
+    """Number of attempts made per endpoint and attempt number."""
+
+    def delay(self, retry: int) -> float:
+        """Return the seconds to wait before the given retry."""
+
+        delay = min(self.backoff_max, self.backoff_base * 2.0 ** (retry - 1))
+        return delay * (1 - self.jitter * random.random())
+
+    async def call(self, endpoint: str, func: Callable[[], Awaitable[T]]) -> T:
+        """Call func until it succeeds, fails permanently or the budget is used up."""
+
+        started = time.monotonic()
+        attempt = 1
+        while True:
+            self.attempts[endpoint, attempt] += 1
+            try:
+                return await self._attempt(func, started)
+            except self.retry_on:
+                if attempt >= self.max_attempts:
+                    raise
+                delay = self.delay(attempt)
+                if (
+                    self.deadline is not None
+                    and time.monotonic() - started + delay > self.deadline
+                ):
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _attempt(self, func: Callable[[], Awaitable[T]], started: float) -> T:
+        """Call func, cancelling it when the deadline passes."""
+
+        if self.deadline is None:
+            return await func()
+        remaining = self.deadline - (time.monotonic() - started)
+        try:
+            async with asyncio.timeout(remaining) as timeout:
+                return await func()
+        except TimeoutError as e:
+            if timeout.expired():
+                raise WRCTimeoutError("Retry deadline exceeded") from e
+            raise
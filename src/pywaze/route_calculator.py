@@ -1,14 +1,43 @@
 """Waze route calculator."""
 
+import asyncio
 import logging
 import re
-from dataclasses import dataclass
-from typing import Any, Literal, TypedDict
+import sys
+from collections.abc import (
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Hashable,
+    Iterable,
+    Mapping,
+    Sequence,
+)
+from dataclasses import dataclass, field
+from functools import partial
+from typing import TYPE_CHECKING, Any, Literal, TypedDict, TypeVar, cast
 
 import httpx
 
+from pywaze.circuit import CircuitBreaker
+from pywaze.decoding import JSONDecoder
+from pywaze.geometry import RouteGeometry
+from pywaze.matrix import RouteMatrix
+from pywaze.segments import RouteBreakdown, RouteSegments, RouteTotals
+from pywaze.singleflight import SingleFlight
+from pywaze.transport import SharedTransport, default_transport
+
+if TYPE_CHECKING:
+    from pywaze.cache import GeocodeCache, RouteCache
+    from pywaze.hedging import HedgePolicy
+    from pywaze.ratelimit import RateLimiter
+    from pywaze.retry import RetryPolicy
+
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 class BaseCoords(TypedDict):
     """Base coordinates."""
@@ -24,16 +53,85 @@ class Coords(BaseCoords):
 
 
 BaseCoordsInput = BaseCoords | str | tuple[float, float]
+Location = str | tuple[float, float] | BaseCoords
+Endpoint = Literal["search", "routing"]
+
+_COORD_CHARS = frozenset("0123456789+-.,\t\n\r\f\v ")
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class CalcRoutesResponse:
-    """The Response from this lib."""
+    """The Response from this lib.
+
+    Instances have no __dict__ and store interned street names in a tuple.
+    Results of calc_routes keep a reference to the segments, street names and
+    coordinates of their raw route until detach is called. Street names,
+    breakdown and geometry left out on construction are built from the raw route
+    on first access.
+    """
 
     duration: float
     distance: float
     name: str
-    street_names: list[str]
+    street_names: tuple[str, ...] = ()
+    totals: RouteTotals | None = None
+    breakdown: RouteBreakdown | None = field(default=None, compare=False, repr=False)
+    geometry: RouteGeometry | None = field(default=None, compare=False, repr=False)
+    _route: dict[str, Any] | None = field(default=None, compare=False, repr=False)
+
+    def __post_init__(self) -> None:
+        """Store street names as a tuple and leave the lazy fields unset."""
+
+        if not isinstance(self.street_names, tuple):
+            object.__setattr__(self, "street_names", tuple(self.street_names))
+        if self._route is None:
+            return
+        for name in _LAZY_RESULT_FIELDS:
+            if not getattr(self, name):
+                object.__delattr__(self, name)
+
+    if not TYPE_CHECKING:
+
+        def __getattr__(self, name: str) -> Any:
+            """Build a lazy field from the raw route on first access."""
+
+            if name not in _LAZY_RESULT_FIELDS:
+                raise AttributeError(name)
+            route = object.__getattribute__(self, "_route")
+            if name == "street_names":
+                value = tuple(
+                    sys.intern(street_name)
+                    for street_name in route.get("streetNames") or ()
+                    if street_name is not None
+                )
+            elif name == "breakdown":
+                value = RouteSegments(_route_results(route), breakdown=True).breakdown()
+            else:
+                value = RouteGeometry.from_route(route)
+            object.__setattr__(self, name, value)
+            return value
+
+    def detach(self) -> "CalcRoutesResponse":
+        """Drop the reference to the raw route.
+
+        Street names are built now. Breakdown and geometry are kept if they were
+        already built, else they are set to None.
+        """
+
+        if self._route is not None:
+            for name in _LAZY_RESULT_FIELDS:
+                try:
+                    object.__getattribute__(self, name)
+                except AttributeError:
+                    value = getattr(self, name) if name == "street_names" else None
+                    object.__setattr__(self, name, value)
+            object.__setattr__(self, "_route", None)
+        return self
+
+
+_LAZY_RESULT_FIELDS = ("street_names", "breakdown", "geometry")
+
+RoutesOrError = list[CalcRoutesResponse] | Exception
 
 
 class WRCError(Exception):
@@ -44,6 +142,22 @@ class WRCTimeoutError(WRCError):
     """Waze Route Calculator Timeout Error."""
 
 
+class WRCServerError(WRCError):
+    """Waze Route Calculator Server Error."""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class WRCCircuitOpenError(WRCError):
+    """Waze Route Calculator Circuit Open Error."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
 class WazeRouteCalculator:
     """Calculate actual route time and distance with Waze API."""
 
@@ -73,6 +187,9 @@ class WazeRouteCalculator:
         "IL": "https://routing-livemap-il.waze.com/RoutingManager/routingRequest",
         "AU": "https://routing-livemap-row.waze.com/RoutingManager/routingRequest",
     }
+    # Hosts of other regions serve other maps, so only hosts serving the
+    # region's map may be listed here. Waze has one per region.
+    ROUTING_FAILOVER = {region: [url] for region, url in ROUTING_SERVERS.items()}
     COORD_MATCH = re.compile(
         r"^([-+]?)([\d]{1,2})(((\.)(\d+)(,)))(\s*)(([-+]?)([\d]{1,3})((\.)(\d+))?)$"
     )
@@ -82,25 +199,105 @@ class WazeRouteCalculator:
         region="EU",
         client: httpx.AsyncClient | None = None,
         timeout: int = 60,
+        geocode_cache: "GeocodeCache | None" = None,
+        coalesce_requests: bool = True,
+        route_cache: "RouteCache | None" = None,
+        rate_limiter: "RateLimiter | None" = None,
+        retry_policy: "RetryPolicy | None" = None,
+        hedge_policy: "HedgePolicy | None" = None,
+        json_decoder: JSONDecoder | None = None,
+        debug_dump_every: int = 0,
+        transport: SharedTransport | None = None,
+        failover: bool = False,
+        routing_hosts: Sequence[str] | None = None,
+        circuit_breakers: Mapping[Endpoint, CircuitBreaker] | None = None,
     ):
         self.region = region
-        self.client = client or httpx.AsyncClient(timeout=timeout)
+        self._client = client
+        self.transport = transport or default_transport()
         self.timeout = timeout
+        self.geocode_cache = geocode_cache
+        self.route_cache = route_cache
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.hedge_policy = hedge_policy
+        self.json_decoder = json_decoder or JSONDecoder()
+        self.debug_dump_every = debug_dump_every
+        self._logged_responses = 0
+        self._warm_up_tasks: set[asyncio.Task[int]] = set()
+        self.circuit_breakers: dict[Endpoint, CircuitBreaker] = dict(
+            circuit_breakers or {}
+        )
+        self.host_breakers: dict[str, CircuitBreaker] = (
+            {
+                url: CircuitBreaker()
+                for url in routing_hosts or self.ROUTING_FAILOVER[region]
+            }
+            if failover
+            else {}
+        )
+        self.inflight: SingleFlight[Hashable] | None = (
+            SingleFlight() if coalesce_requests else None
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Return the client passed in, else the shared client of the event loop."""
+
+        if self._client is not None:
+            return self._client
+        return self.transport.client()
 
     def already_coords(self, address: str) -> bool:
         """Already coordinates or address."""
+        return self.parse_coords(address) is not None
 
-        m = re.search(self.COORD_MATCH, address)
-        return m is not None
+    def parse_coords(self, location: Location) -> Coords | None:
+        """Return the coordinates of location, or None if it is an address.
+
+        Strings with characters other than digits, signs, separators and
+        whitespace are addresses without running COORD_MATCH.
+        """
+
+        if isinstance(location, tuple):
+            return {"lat": float(location[0]), "lon": float(location[1]), "bounds": {}}
+        if isinstance(location, dict):
+            coords = cast(Mapping[str, Any], location)
+            return {
+                "lat": float(coords["lat"]),
+                "lon": float(coords["lon"]),
+                "bounds": dict(coords.get("bounds") or {}),
+            }
+        if not location or not _COORD_CHARS.issuperset(location):
+            return None
+        match = self.COORD_MATCH.match(location)
+        if match is None:
+            return None
+        return {
+            "lat": float(location[: match.start(7)]),
+            "lon": float(match.group(9)),
+            "bounds": {},
+        }
+
+    def _location_key(self, location: Location) -> Hashable:
+        """Return a hashable key of location: the string or its coordinates."""
+
+        if isinstance(location, str):
+            return location
+        coords = cast(Coords, self.parse_coords(location))
+        return coords["lat"], coords["lon"], tuple(sorted(coords["bounds"].items()))
 
     async def _ensure_coords(
         self,
-        address: str,
+        location: Location,
         base_coords: BaseCoords | None = None,
     ) -> Coords:
-        if self.already_coords(address):
-            return self.coords_string_parser(address)
-        return await self.address_to_coords(address, base_coords=base_coords)
+        coords = self.parse_coords(location)
+        if coords is not None:
+            return coords
+        return await self.address_to_coords(
+            cast(str, location), base_coords=base_coords
+        )
 
     def coords_string_parser(self, coords: str) -> Coords:
         """Parse the address string into coordinates to match address_to_coords return object."""
@@ -130,7 +327,119 @@ class WazeRouteCalculator:
     ) -> Coords:
         """Convert address to coordinates."""
 
-        base_coords = base_coords or self.BASE_COORDS[self.region]
+        resolved_base_coords = base_coords or self.BASE_COORDS[self.region]
+        cache_key = None
+        if self.geocode_cache is not None:
+            cache_key = self.geocode_cache.make_key(
+                self.region, address, resolved_base_coords
+            )
+            cached_coords = await self.geocode_cache.aget(cache_key)
+            if cached_coords is not None:
+                return cached_coords
+
+        coords: Coords = await self._coalesce(
+            (
+                "search",
+                self.region,
+                address,
+                resolved_base_coords["lat"],
+                resolved_base_coords["lon"],
+            ),
+            lambda: self._fetch_coords(address, resolved_base_coords),
+        )
+        if self.geocode_cache is not None and cache_key is not None:
+            await self.geocode_cache.aset(cache_key, coords)
+        return coords
+
+    async def _coalesce(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Share the outcome of func between concurrent calls with the same key."""
+
+        if self.inflight is None:
+            return await func()
+        return await self.inflight.do(key, func)
+
+    async def _request(
+        self,
+        endpoint: Endpoint,
+        url: str,
+        params: Mapping[str, str | int | float],
+        timeout_message: str,
+    ) -> httpx.Response:
+        """Request a Waze endpoint, retrying transient failures."""
+
+        return await self._call(
+            endpoint, partial(self._send, endpoint, url, params, timeout_message)
+        )
+
+    async def _call(
+        self, endpoint: Endpoint, send: Callable[[], Awaitable[httpx.Response]]
+    ) -> httpx.Response:
+        """Call send, hedged and retried as configured."""
+
+        if endpoint == "routing" and self.hedge_policy is not None:
+            send = partial(self.hedge_policy.call, send)
+        if self.retry_policy is None:
+            return await send()
+        return await self.retry_policy.call(endpoint, send)
+
+    async def _send(
+        self,
+        endpoint: Endpoint,
+        url: str,
+        params: Mapping[str, str | int | float],
+        timeout_message: str,
+    ) -> httpx.Response:
+        """Send a single request and raise on timeouts and server errors."""
+
+        breaker = self.circuit_breakers.get(endpoint)
+        if breaker is None:
+            return await self._send_checked(endpoint, url, params, timeout_message)
+        if not breaker.allow():
+            raise WRCCircuitOpenError(
+                f"Circuit for {endpoint} requests is open", breaker.retry_after()
+            )
+        try:
+            response = await self._send_checked(endpoint, url, params, timeout_message)
+        except (WRCTimeoutError, WRCServerError, httpx.TransportError):
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record_success()
+        return response
+
+    async def _send_checked(
+        self,
+        endpoint: Endpoint,
+        url: str,
+        params: Mapping[str, str | int | float],
+        timeout_message: str,
+    ) -> httpx.Response:
+        """Send a request and map timeouts and server errors to WRC errors."""
+
+        try:
+            response = await self._get(endpoint, url, params)
+        except httpx.TimeoutException as e:
+            raise WRCTimeoutError(timeout_message) from e
+        if response.is_server_error or response.status_code == 429:
+            raise WRCServerError(response.text, response.status_code)
+        return response
+
+    async def _get(
+        self, endpoint: Endpoint, url: str, params: Mapping[str, str | int | float]
+    ) -> httpx.Response:
+        """Send a GET request to a Waze endpoint."""
+
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(endpoint)
+        return await self.client.get(
+            url, params=params, headers=self.HEADERS, timeout=self.timeout
+        )
+
+    async def _fetch_coords(self, address: str, base_coords: BaseCoords) -> Coords:
+        """Look up the coordinates of an address on the search server."""
+
         get_cord = self.COORD_SERVERS[self.region]
         url_options: dict[str, str | float] = {
             "q": address,
@@ -140,16 +449,13 @@ class WazeRouteCalculator:
             "lon": base_coords["lon"],
         }
 
-        try:
-            response: httpx.Response = await self.client.get(
-                self.WAZE_URL + get_cord,
-                params=url_options,
-                headers=self.HEADERS,
-                timeout=self.timeout,
-            )
-        except httpx.TimeoutException as e:
-            raise WRCTimeoutError(f"Timeout getting coords for {address}") from e
-        for response_json in response.json():
+        response = await self._request(
+            "search",
+            self.WAZE_URL + get_cord,
+            url_options,
+            f"Timeout getting coords for {address}",
+        )
+        for response_json in self.json_decoder.decode(response.content):
             if response_json.get("city"):
                 lat: float = response_json["location"]["lat"]
                 lon: float = response_json["location"]["lon"]
@@ -180,60 +486,165 @@ class WazeRouteCalculator:
         avoid_ferries: bool = False,
         alternatives: int = 1,
         time_delta: int = 0,
+        return_geometries: bool = True,
+        return_instructions: bool = True,
     ) -> list[dict[str, Any]]:
-        """Get route data from waze."""
+        """Get route data from waze.
+
+        Turn off return_geometries and return_instructions to leave the route
+        geometry and the turn and lane instructions out of the response.
+        """
 
         routing_server = self.ROUTING_SERVERS[self.region]
+        url_options = _routing_url_options(
+            start,
+            end,
+            vehicle_type,
+            avoid_toll_roads,
+            avoid_subscription_roads,
+            avoid_ferries,
+            alternatives,
+            time_delta,
+            return_geometries,
+            return_instructions,
+        )
 
-        route_options = {
-            "AVOID_TRAILS": "t",
-            "AVOID_TOLL_ROADS": "t" if avoid_toll_roads else "f",
-            "AVOID_FERRIES": "t" if avoid_ferries else "f",
-        }
+        cache_key = None
+        if self.route_cache is not None:
+            cache_key = self.route_cache.make_key(
+                routing_server,
+                start,
+                end,
+                {k: v for k, v in url_options.items() if k not in ("from", "to")},
+                time_delta=time_delta,
+            )
+            cached_routes = self.route_cache.get(cache_key)
+            if cached_routes is not None:
+                return cached_routes
 
-        url_options: dict[str, str | int] = {
-            "from": f"x:{start['lon']} y:{start['lat']}",
-            "to": f"x:{end['lon']} y:{end['lat']}",
-            "at": time_delta,
-            "returnJSON": "true",
-            "returnGeometries": "true",
-            "returnInstructions": "true",
-            "timeout": 60000,
-            "nPaths": alternatives,
-            "options": ",".join(
-                f"{opt}:{value}" for (opt, value) in route_options.items()
-            ),
-        }
-        if vehicle_type:
-            url_options["vehicleType"] = vehicle_type.upper()
-        # Handle vignette system in Europe. Defaults to false (show all routes)
-        if avoid_subscription_roads is False:
-            url_options["subscription"] = "*"
+        routes: list[dict[str, Any]] = await self._coalesce(
+            ("routing", routing_server, *sorted(url_options.items())),
+            lambda: self._fetch_routes(routing_server, url_options),
+        )
+        if self.route_cache is not None and cache_key is not None:
+            self.route_cache.set(cache_key, routes)
+        return routes
 
+    async def get_routes_raw(
+        self,
+        start: Coords,
+        end: Coords,
+        vehicle_type: Literal[None, "TAXI", "MOTORCYCLE"] = None,
+        avoid_toll_roads: bool = False,
+        avoid_subscription_roads: bool = False,
+        avoid_ferries: bool = False,
+        alternatives: int = 1,
+        time_delta: int = 0,
+        return_geometries: bool = True,
+        return_instructions: bool = True,
+    ) -> bytes:
+        """Get the undecoded routing response from waze.
+
+        The route cache and request coalescing are bypassed.
+        """
+
+        routing_server = self.ROUTING_SERVERS[self.region]
+        url_options = _routing_url_options(
+            start,
+            end,
+            vehicle_type,
+            avoid_toll_roads,
+            avoid_subscription_roads,
+            avoid_ferries,
+            alternatives,
+            time_delta,
+            return_geometries,
+            return_instructions,
+        )
+        if self.host_breakers:
+            response = await self._request_with_failover(url_options)
+        else:
+            response = await self._request(
+                "routing", routing_server, url_options, "Timeout getting route"
+            )
+        if not response.is_success:
+            raise WRCError(response.text)
+        return response.content
+
+    async def _fetch_routes(
+        self, routing_server: str, url_options: dict[str, str | int]
+    ) -> list[dict[str, Any]]:
+        """Request routes from the routing server."""
+
+        if self.host_breakers:
+            response = await self._request_with_failover(url_options)
+        else:
+            response = await self._request(
+                "routing", routing_server, url_options, "Timeout getting route"
+            )
+        return _response_routes(self._check_response(response))
+
+    async def _request_with_failover(
+        self, url_options: dict[str, str | int]
+    ) -> httpx.Response:
+        """Send a routing request, choosing a healthy host for every attempt.
+
+        Every attempt of the retry policy goes to the first healthy host that
+        has not failed during this request, else to the one that failed first.
+        Without a retry policy a failed request is sent once more to a healthy
+        host that has not failed, if there is one.
+        """
+
+        failed: list[str] = []
+        send = partial(self._send_to_healthy_host, url_options, failed)
         try:
-            response: httpx.Response = await self.client.get(
-                routing_server,
-                params=url_options,
-                headers=self.HEADERS,
-                timeout=self.timeout,
+            return await self._call("routing", send)
+        except (WRCTimeoutError, WRCServerError, httpx.TransportError):
+            if self.retry_policy is not None or not any(
+                url not in failed and breaker.state != "open"
+                for url, breaker in self.host_breakers.items()
+            ):
+                raise
+        return await self._call("routing", send)
+
+    async def _send_to_healthy_host(
+        self, url_options: dict[str, str | int], failed: list[str]
+    ) -> httpx.Response:
+        """Send one attempt to a healthy host, preferring hosts not in failed."""
+
+        hosts = sorted(
+            self.host_breakers,
+            key=lambda url: failed.index(url) if url in failed else -1,
+        )
+        for url in hosts:
+            breaker = self.host_breakers[url]
+            if breaker.allow():
+                break
+        else:
+            raise WRCError("All routing hosts are unavailable")
+        try:
+            response = await self._send(
+                "routing", url, url_options, "Timeout getting route"
             )
-        except httpx.TimeoutException as e:
-            raise WRCTimeoutError("Timeout getting route") from e
-        response_json = self._check_response(response)
-        if response_json.get("alternatives"):
-            return [alt["response"] for alt in response_json["alternatives"]]
-        response_obj = response_json["response"]
-        if isinstance(response_obj, list):
-            response_obj = response_obj[0]
-        return [response_obj]
-
-    @staticmethod
-    def _check_response(response: httpx.Response) -> Any:
+        except (WRCTimeoutError, WRCServerError, httpx.TransportError):
+            breaker.record_failure()
+            if url in failed:
+                failed.remove(url)
+            failed.append(url)
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record_success()
+        return response
+
+    def _check_response(self, response: httpx.Response) -> Any:
         """Check waze server response."""
         if response.is_success:
             try:
-                response_json = response.json()
-                logger.debug("Response is: %s", response_json)
+                response_json = self.json_decoder.decode_routing(response.content)
+                if logger.isEnabledFor(logging.DEBUG):
+                    self._log_response(response, response_json)
                 if "error" in response_json:
                     raise WRCError(response_json.get("error"))
                 return response_json
@@ -241,6 +652,30 @@ class WazeRouteCalculator:
                 raise WRCError("empty response")
         raise WRCError(response.text)
 
+    def _log_response(self, response: httpx.Response, response_json: Any) -> None:
+        """Log a summary of a routing response and sample full dumps."""
+
+        try:
+            routes = [route for route, _ in _response_route_parents(response_json)]
+        except (KeyError, IndexError, TypeError, AttributeError):
+            routes = []
+        logger.debug(
+            "Response from %s: %d bytes, %d alternatives, %d segments",
+            response.url.host,
+            len(response.content),
+            len(routes),
+            sum(
+                len(route.get("results") or route.get("result") or ())
+                for route in routes
+            ),
+        )
+        self._logged_responses += 1
+        if (
+            self.debug_dump_every
+            and self._logged_responses % self.debug_dump_every == 0
+        ):
+            logger.debug("Response is: %s", response_json)
+
     def _add_up_route(
         self,
         results: list[dict],
@@ -251,44 +686,15 @@ class WazeRouteCalculator:
     ) -> tuple[float, float]:
         """Calculate route time and distance."""
 
-        def between(target: float, min: float, max: float) -> bool:
-            return target > min and target < max
-
-        time = 0
-        distance = 0
-        for segment in results:
-            if stop_at_bounds and segment.get("path"):
-                x = segment["path"]["x"]
-                y = segment["path"]["y"]
-                if (
-                    between(
-                        x, start_bounds.get("left", 0), start_bounds.get("right", 0)
-                    )
-                    or between(x, end_bounds.get("left", 0), end_bounds.get("right", 0))
-                ) and (
-                    between(
-                        y, start_bounds.get("bottom", 0), start_bounds.get("top", 0)
-                    )
-                    or between(y, end_bounds.get("bottom", 0), end_bounds.get("top", 0))
-                ):
-                    continue
-            if "crossTime" in segment:
-                time += segment[
-                    "crossTime" if real_time else "crossTimeWithoutRealTime"
-                ]
-            else:
-                time += segment[
-                    "cross_time" if real_time else "cross_time_without_real_time"
-                ]
-            distance += segment["length"]
-        route_time = time / 60.0
-        route_distance = distance / 1000.0
-        return route_time, route_distance
+        totals = RouteSegments(results).totals(
+            start_bounds, end_bounds, bounded=stop_at_bounds
+        )
+        return totals.select(real_time=real_time, stop_at_bounds=stop_at_bounds)
 
     async def calc_routes(
         self,
-        start: str,
-        end: str,
+        start: Location,
+        end: Location,
         vehicle_type: Literal[None, "TAXI", "MOTORCYCLE"] = None,
         avoid_toll_roads: bool = False,
         avoid_subscription_roads: bool = False,
@@ -298,8 +704,46 @@ class WazeRouteCalculator:
         real_time: bool = True,
         stop_at_bounds: bool = False,
         base_coords: BaseCoordsInput | None = None,
+        full_payload: bool = False,
+        breakdown: bool = False,
     ) -> list[CalcRoutesResponse]:
-        """Get route info with enhanced calculations like total distance."""
+        """Get route info with enhanced calculations like total distance.
+
+        Only the data needed for the results is requested from Waze unless
+        full_payload is set. With breakdown the results carry per segment data.
+        Start and end are addresses, coordinate strings, (lat, lon) tuples or
+        dicts with lat and lon.
+        """
+
+        start_coords, end_coords = await self._resolve_endpoints(
+            start, end, base_coords
+        )
+        return await self._calc_resolved_routes(
+            start_coords,
+            end_coords,
+            real_time=real_time,
+            stop_at_bounds=stop_at_bounds,
+            full_payload=full_payload,
+            breakdown=breakdown,
+            vehicle_type=vehicle_type,
+            avoid_toll_roads=avoid_toll_roads,
+            avoid_subscription_roads=avoid_subscription_roads,
+            avoid_ferries=avoid_ferries,
+            alternatives=alternatives,
+            time_delta=time_delta,
+        )
+
+    async def _resolve_endpoints(
+        self,
+        start: Location,
+        end: Location,
+        base_coords: BaseCoordsInput | None = None,
+        lookups: dict[Hashable, asyncio.Future[Coords]] | None = None,
+    ) -> tuple[Coords, Coords]:
+        """Resolve start and end to coordinates.
+
+        Lookups shares address resolving between the pairs of a batch.
+        """
 
         resolved_base_coords = (
             self._normalize_base_coords(base_coords)
@@ -307,57 +751,333 @@ class WazeRouteCalculator:
             else None
         )
 
-        start_is_coords = self.already_coords(start)
-        end_is_coords = self.already_coords(end)
+        start_coords = self.parse_coords(start)
+        end_coords = self.parse_coords(end)
 
         if resolved_base_coords is None:
-            if start_is_coords and not end_is_coords:
-                resolved_base_coords = self._normalize_base_coords(start)
-            elif end_is_coords and not start_is_coords:
-                resolved_base_coords = self._normalize_base_coords(end)
+            known_coords = start_coords or end_coords
+            if known_coords is not None and (
+                start_coords is None or end_coords is None
+            ):
+                resolved_base_coords = {
+                    "lat": known_coords["lat"],
+                    "lon": known_coords["lon"],
+                }
 
-        start_coords = await self._ensure_coords(
-            start, base_coords=resolved_base_coords
-        )
-        end_coords = await self._ensure_coords(end, base_coords=resolved_base_coords)
+        if start_coords is None:
+            start_coords = await self._lookup_coords(
+                cast(str, start), resolved_base_coords, lookups
+            )
+        if end_coords is None:
+            end_coords = await self._lookup_coords(
+                cast(str, end), resolved_base_coords, lookups
+            )
+        return start_coords, end_coords
+
+    async def _lookup_coords(
+        self,
+        address: str,
+        base_coords: BaseCoords | None,
+        lookups: dict[Hashable, asyncio.Future[Coords]] | None,
+    ) -> Coords:
+        """Resolve an address, at most once per batch if lookups is given."""
+
+        if lookups is None:
+            return await self.address_to_coords(address, base_coords=base_coords)
+        key = (address, *base_coords.values()) if base_coords else address
+        lookup = lookups.get(key)
+        if lookup is None:
+            lookup = asyncio.ensure_future(
+                self.address_to_coords(address, base_coords=base_coords)
+            )
+            lookups[key] = lookup
+        return await asyncio.shield(lookup)
+
+    async def _calc_resolved_routes(
+        self,
+        start_coords: Coords,
+        end_coords: Coords,
+        real_time: bool = True,
+        stop_at_bounds: bool = False,
+        full_payload: bool = False,
+        breakdown: bool = False,
+        **route_options: Any,
+    ) -> list[CalcRoutesResponse]:
+        """Get routes between resolved coordinates and add them up."""
 
         routes = await self.get_routes(
             start_coords,
             end_coords,
-            vehicle_type=vehicle_type,
-            avoid_toll_roads=avoid_toll_roads,
-            avoid_subscription_roads=avoid_subscription_roads,
-            avoid_ferries=avoid_ferries,
-            alternatives=alternatives,
-            time_delta=time_delta,
+            return_geometries=full_payload,
+            return_instructions=full_payload,
+            **route_options,
         )
         result = []
         for route in routes:
-            results = route["results" if "results" in route else "result"]
-            duration, distance = self._add_up_route(
-                results,
-                start_coords["bounds"],
-                end_coords["bounds"],
-                real_time=real_time,
-                stop_at_bounds=stop_at_bounds,
+            segments = RouteSegments(_route_results(route), breakdown=breakdown)
+            totals = segments.totals(
+                start_coords["bounds"], end_coords["bounds"], bounded=stop_at_bounds
+            )
+            duration, distance = totals.select(
+                real_time=real_time, stop_at_bounds=stop_at_bounds
             )
             result.append(
                 CalcRoutesResponse(
                     distance=distance,
                     duration=duration,
-                    name=route.get("routeName", ""),
-                    street_names=[
-                        name
-                        for name in route.get("streetNames", {})
-                        if name is not None
-                    ],
+                    totals=totals,
+                    breakdown=segments.breakdown() if breakdown else None,
+                    name=sys.intern(route.get("routeName") or ""),
+                    _route=_lazy_route(route),
                 )
             )
         return result
 
+    async def calc_routes_many(
+        self,
+        pairs: Iterable[tuple[Location, Location]],
+        concurrency: int = 10,
+        base_coords: BaseCoordsInput | None = None,
+        **route_options: Any,
+    ) -> list[RoutesOrError]:
+        """Calculate routes for many start and end pairs.
+
+        Accepts the options of calc_routes. Addresses shared between pairs are
+        resolved once and at most concurrency pairs are calculated at a time.
+        Returns the routes or the raised exception of each pair in input order.
+        """
+
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        lookups: dict[Hashable, asyncio.Future[Coords]] = {}
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def calc_pair(start: Location, end: Location) -> RoutesOrError:
+            async with semaphore:
+                return await self._calc_pair(
+                    start, end, base_coords, lookups, route_options
+                )
+
+        try:
+            return await asyncio.gather(
+                *(calc_pair(start, end) for start, end in pairs)
+            )
+        finally:
+            for lookup in lookups.values():
+                lookup.cancel()
+
+    async def stream_routes(
+        self,
+        pairs: (
+            Iterable[tuple[Location, Location]]
+            | AsyncIterable[tuple[Location, Location]]
+        ),
+        concurrency: int = 10,
+        base_coords: BaseCoordsInput | None = None,
+        **route_options: Any,
+    ) -> AsyncIterator[tuple[int, RoutesOrError]]:
+        """Yield the input index and result of each pair as soon as it is done.
+
+        Accepts the options of calc_routes. Pairs are read lazily from a sync or
+        async iterable and at most concurrency pairs are in flight at a time.
+        """
+
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        lookups: dict[Hashable, asyncio.Future[Coords]] = {}
+        pending: set[asyncio.Future[tuple[int, RoutesOrError]]] = set()
+
+        async def calc_pair(
+            index: int, start: Location, end: Location
+        ) -> tuple[int, RoutesOrError]:
+            return index, await self._calc_pair(
+                start, end, base_coords, lookups, route_options
+            )
+
+        input_pairs = aiter(_as_async_iterable(pairs))
+        index = 0
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < concurrency:
+                    try:
+                        start, end = await anext(input_pairs)
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    pending.add(asyncio.ensure_future(calc_pair(index, start, end)))
+                    index += 1
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            for lookup in lookups.values():
+                lookup.cancel()
+
+    async def calc_matrix(
+        self,
+        origins: Iterable[Location],
+        destinations: Iterable[Location],
+        concurrency: int = 10,
+        base_coords: BaseCoordsInput | None = None,
+        **route_options: Any,
+    ) -> RouteMatrix:
+        """Calculate durations and distances from every origin to every destination.
+
+        Accepts the options of calc_routes. Every distinct origin and destination is
+        resolved once, using base_coords or the region default for addresses.
+        Coordinates given as tuples or dicts are told apart by their values. The
+        first route of each pair is used.
+        """
+
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        matrix = RouteMatrix.empty(list(origins), list(destinations))
+        resolved_base_coords = (
+            self._normalize_base_coords(base_coords)
+            if base_coords is not None
+            else None
+        )
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def resolve(endpoint: Location) -> Coords | Exception:
+            async with semaphore:
+                try:
+                    return await self._ensure_coords(
+                        endpoint, base_coords=resolved_base_coords
+                    )
+                except Exception as e:
+                    return e
+
+        origin_keys = [self._location_key(origin) for origin in matrix.origins]
+        destination_keys = [
+            self._location_key(destination) for destination in matrix.destinations
+        ]
+        endpoints: dict[Hashable, Location] = {}
+        for key, endpoint in zip(
+            [*origin_keys, *destination_keys],
+            [*matrix.origins, *matrix.destinations],
+            strict=True,
+        ):
+            endpoints.setdefault(key, endpoint)
+        coords = dict(
+            zip(
+                endpoints,
+                await asyncio.gather(*map(resolve, endpoints.values())),
+                strict=True,
+            )
+        )
+
+        async def calc_cell(origin: int, destination: int) -> None:
+            start = coords[origin_keys[origin]]
+            end = coords[destination_keys[destination]]
+            if isinstance(start, Exception) or isinstance(end, Exception):
+                matrix.errors[origin, destination] = (
+                    start if isinstance(start, Exception) else cast(Exception, end)
+                )
+                return
+            async with semaphore:
+                try:
+                    routes = await self._calc_resolved_routes(
+                        start, end, **route_options
+                    )
+                except Exception as e:
+                    matrix.errors[origin, destination] = e
+                    return
+            matrix.set(origin, destination, routes[0].duration, routes[0].distance)
+
+        await asyncio.gather(
+            *(
+                calc_cell(origin, destination)
+                for origin in range(len(matrix.origins))
+                for destination in range(len(matrix.destinations))
+            )
+        )
+        return matrix
+
+    async def _calc_pair(
+        self,
+        start: Location,
+        end: Location,
+        base_coords: BaseCoordsInput | None,
+        lookups: dict[Hashable, asyncio.Future[Coords]],
+        route_options: dict[str, Any],
+    ) -> RoutesOrError:
+        """Calculate the routes of one batch pair and return errors instead of raising."""
+
+        try:
+            start_coords, end_coords = await self._resolve_endpoints(
+                start, end, base_coords, lookups
+            )
+            return await self._calc_resolved_routes(
+                start_coords, end_coords, **route_options
+            )
+        except Exception as e:
+            return e
+
+    async def warm_up(self, connections: int = 2) -> int:
+        """Open connections to the search and routing servers of the region.
+
+        Sends connections concurrent HEAD requests to each server, so the pools
+        keep that many connections alive as long as their keep-alive limits
+        allow. Failures are logged and ignored. Returns the number of successful
+        requests.
+        """
+
+        return await self._warm_up(connections)
+
+    def start_warm_up(self, connections: int = 2) -> "asyncio.Task[int]":
+        """Start warm_up in a task and return it.
+
+        The calculator keeps the task until it is done and cancels it on close.
+        """
+
+        task = asyncio.create_task(self._warm_up(connections))
+        self._warm_up_tasks.add(task)
+        task.add_done_callback(self._warm_up_tasks.discard)
+        return task
+
+    async def _warm_up(self, connections: int) -> int:
+        """Send the warm up requests concurrently."""
+
+        routing_url = httpx.URL(self.ROUTING_SERVERS[self.region])
+        urls: list[tuple[Endpoint, str]] = [
+            ("search", self.WAZE_URL),
+            ("routing", f"{routing_url.scheme}://{routing_url.host}/"),
+        ]
+        results = await asyncio.gather(
+            *(
+                self._warm_up_connection(endpoint, url)
+                for endpoint, url in urls
+                for _ in range(connections)
+            )
+        )
+        return sum(results)
+
+    async def _warm_up_connection(self, endpoint: Endpoint, url: str) -> bool:
+        """Send a HEAD request to open a connection."""
+
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(endpoint)
+        try:
+            await self.client.head(url, headers=self.HEADERS, timeout=self.timeout)
+        except httpx.HTTPError as e:
+            logger.debug("Warming up %s failed: %r", url, e)
+            return False
+        return True
+
     async def close(self) -> None:
-        """Close the client."""
-        await self.client.aclose()
+        """Close the client passed in. The shared client is left open."""
+        for task in self._warm_up_tasks:
+            task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
 
     async def __aenter__(self) -> "WazeRouteCalculator":
         """Support asynchronous context manager protocol."""
@@ -366,3 +1086,104 @@ class WazeRouteCalculator:
     async def __aexit__(self, exc_type, exc, tb):
         """Close the client."""
         await self.close()
+
+
+def _routing_url_options(
+    start: Coords,
+    end: Coords,
+    vehicle_type: str | None,
+    avoid_toll_roads: bool,
+    avoid_subscription_roads: bool,
+    avoid_ferries: bool,
+    alternatives: int,
+    time_delta: int,
+    return_geometries: bool,
+    return_instructions: bool,
+) -> dict[str, str | int]:
+    """Build the query parameters of a routing request."""
+
+    route_options = {
+        "AVOID_TRAILS": "t",
+        "AVOID_TOLL_ROADS": "t" if avoid_toll_roads else "f",
+        "AVOID_FERRIES": "t" if avoid_ferries else "f",
+    }
+
+    url_options: dict[str, str | int] = {
+        "from": f"x:{start['lon']} y:{start['lat']}",
+        "to": f"x:{end['lon']} y:{end['lat']}",
+        "at": time_delta,
+        "returnJSON": "true",
+        "returnGeometries": "true" if return_geometries else "false",
+        "returnInstructions": "true" if return_instructions else "false",
+        "timeout": 60000,
+        "nPaths": alternatives,
+        "options": ",".join(f"{opt}:{value}" for (opt, value) in route_options.items()),
+    }
+    if vehicle_type:
+        url_options["vehicleType"] = vehicle_type.upper()
+    # Handle vignette system in Europe. Defaults to false (show all routes)
+    if avoid_subscription_roads is False:
+        url_options["subscription"] = "*"
+    return url_options
+
+
+def _route_results(route: dict[str, Any]) -> list[dict[str, Any]]:
+    """Return the segments of a route."""
+
+    results: list[dict[str, Any]] = route["results" if "results" in route else "result"]
+    return results
+
+
+def _lazy_route(route: dict[str, Any]) -> dict[str, Any]:
+    """Return the parts of a route the lazy result fields are built from."""
+
+    return {key: route[key] for key in _LAZY_ROUTE_KEYS if key in route}
+
+
+_LAZY_ROUTE_KEYS = ("results", "result", "streetNames", "coords")
+
+
+def _response_routes(response_json: Any) -> list[dict[str, Any]]:
+    """Return the routes of a routing response.
+
+    The coordinates list next to a route, if any, is moved into the route.
+    """
+
+    return [
+        _with_coords(route, parent)
+        for route, parent in _response_route_parents(response_json)
+    ]
+
+
+def _response_route_parents(
+    response_json: Any,
+) -> list[tuple[dict[str, Any], dict[str, Any]]]:
+    """Return the routes of a routing response with the objects holding them."""
+
+    if response_json.get("alternatives"):
+        return [(alt["response"], alt) for alt in response_json["alternatives"]]
+    response_obj = response_json["response"]
+    if isinstance(response_obj, list):
+        response_obj = response_obj[0]
+    return [(response_obj, response_json)]
+
+
+def _with_coords(route: dict[str, Any], parent: dict[str, Any]) -> dict[str, Any]:
+    """Add the coordinates list of parent to route."""
+
+    if "coords" in parent and "coords" not in route:
+        route["coords"] = parent["coords"]
+    return route
+
+
+async def _as_async_iterable(
+    items: Iterable[T] | AsyncIterable[T],
+) -> AsyncIterator[T]:
+    """Iterate over a sync or async iterable."""
+
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
@@ -0,0 +1,333 @@
+"""Columnar route segments."""
+
+import math
+from array import array
+from dataclasses import dataclass
+from functools import cached_property
+from itertools import compress
+from operator import itemgetter
+from typing import Any
+
+_LENGTH = itemgetter("length")
+_CROSS_TIME = ("crossTime", "cross_time")
+_CROSS_TIME_WITHOUT_REAL_TIME = (
+    "crossTimeWithoutRealTime",
+    "cross_time_without_real_time",
+)
+_GETTERS = {
+    key: itemgetter(key) for key in (*_CROSS_TIME, *_CROSS_TIME_WITHOUT_REAL_TIME)
+}
+
+
+@dataclass(frozen=True, slots=True)
+class RouteTotals:
+    """Durations in minutes and distances in kilometers of a route.
+
+    The bounded figures leave out the segments within the start and end bounds
+    and are None unless they were asked for. A duration is None when a segment
+    lacks the cross time it is made of.
+    """
+
+    duration: float | None
+    duration_without_real_time: float | None
+    distance: float
+    bounded_duration: float | None = None
+    bounded_duration_without_real_time: float | None = None
+    bounded_distance: float | None = None
+
+    def select(
+        self, real_time: bool = True, stop_at_bounds: bool = False
+    ) -> tuple[float, float]:
+        """Return the duration and distance matching the calc_routes options.
+
+        Raises KeyError if the selected duration is unknown.
+        """
+
+        if stop_at_bounds:
+            if self.bounded_distance is None:
+                raise ValueError("bounded totals were not computed")
+            duration = (
+                self.bounded_duration
+                if real_time
+                else self.bounded_duration_without_real_time
+            )
+            distance = self.bounded_distance
+        else:
+            duration = self.duration if real_time else self.duration_without_real_time
+            distance = self.distance
+        if duration is None:
+            raise KeyError("crossTime" if real_time else "crossTimeWithoutRealTime")
+        return duration, distance
+
+
+@dataclass(frozen=True, slots=True)
+class SegmentRecord:
+    """A single route segment, for callers keeping per segment data."""
+
+    x: float
+    y: float
+    length: float
+    cross_time: float
+    cross_time_without_real_time: float
+
+
+@dataclass(frozen=True, slots=True)
+class BreakdownTotals:
+    """Durations in minutes and distance in kilometers of a group of segments."""
+
+    duration: float
+    duration_without_real_time: float
+    distance: float
+
+
+class RouteBreakdown:
+    """Per segment data of a route, one array per field.
+
+    Unknown segment ids and road types are -1.
+    """
+
+    __slots__ = (
+        "cross_time",
+        "cross_time_without_real_time",
+        "is_toll",
+        "length",
+        "road_type",
+        "segment_id",
+    )
+
+    def __init__(
+        self,
+        segment_id: "array[int]",
+        cross_time: "array[float]",
+        cross_time_without_real_time: "array[float]",
+        length: "array[float]",
+        road_type: "array[int]",
+        is_toll: "array[int]",
+    ):
+        self.segment_id = segment_id
+        self.cross_time = cross_time
+        self.cross_time_without_real_time = cross_time_without_real_time
+        self.length = length
+        self.road_type = road_type
+        self.is_toll = is_toll
+
+    def __len__(self) -> int:
+        """Return the number of segments."""
+        return len(self.length)
+
+    def by_road_type(self) -> dict[int, BreakdownTotals]:
+        """Return the totals of the segments of each road type."""
+        return self._group(self.road_type)
+
+    def by_toll(self) -> dict[bool, BreakdownTotals]:
+        """Return the totals of the toll and the non-toll segments."""
+        return {
+            bool(is_toll): totals
+            for is_toll, totals in self._group(self.is_toll).items()
+        }
+
+    def _group(self, keys: "array[int]") -> dict[int, BreakdownTotals]:
+        sums: dict[int, list[float]] = {}
+        for key, cross_time, without_real_time, length in zip(
+            keys,
+            self.cross_time,
+            self.cross_time_without_real_time,
+            self.length,
+            strict=True,
+        ):
+            group = sums.setdefault(key, [0.0, 0.0, 0.0])
+            group[0] += cross_time
+            group[1] += without_real_time
+            group[2] += length
+        return {
+            key: BreakdownTotals(
+                duration=group[0] / 60.0,
+                duration_without_real_time=group[1] / 60.0,
+                distance=group[2] / 1000.0,
+            )
+            for key, group in sums.items()
+        }
+
+
+class RouteSegments:
+    """The segments of a route and the totals computed from them.
+
+    Totals are summed straight from the segment dicts with C level iteration;
+    the bounded totals sum the segments left by the bounds filter. Segments
+    without a path are never within bounds. The columns used by records and
+    the breakdown are built on first use, each in one step, with NaN for
+    missing cross times.
+    """
+
+    def __init__(self, results: list[dict[str, Any]], breakdown: bool = False):
+        self.results = results
+        self.with_breakdown = breakdown
+
+    def __len__(self) -> int:
+        """Return the number of segments."""
+        return len(self.results)
+
+    @cached_property
+    def x(self) -> "array[float]":
+        """Return the longitudes of the segments."""
+        return array(
+            "d",
+            [
+                path["x"] if (path := segment.get("path")) else math.nan
+                for segment in self.results
+            ],
+        )
+
+    @cached_property
+    def y(self) -> "array[float]":
+        """Return the latitudes of the segments."""
+        return array(
+            "d",
+            [
+                path["y"] if (path := segment.get("path")) else math.nan
+                for segment in self.results
+            ],
+        )
+
+    @cached_property
+    def length(self) -> "array[float]":
+        """Return the lengths of the segments in meters."""
+        return array("d", [segment["length"] for segment in self.results])
+
+    @cached_property
+    def cross_time(self) -> "array[float]":
+        """Return the cross times of the segments in seconds."""
+        return self._cross_time_column(*_CROSS_TIME)
+
+    @cached_property
+    def cross_time_without_real_time(self) -> "array[float]":
+        """Return the cross times without real time data in seconds."""
+        return self._cross_time_column(*_CROSS_TIME_WITHOUT_REAL_TIME)
+
+    def _cross_time_column(self, key: str, legacy_key: str) -> "array[float]":
+        return array(
+            "d",
+            [
+                segment.get(key if "crossTime" in segment else legacy_key, math.nan)
+                for segment in self.results
+            ],
+        )
+
+    def breakdown(self) -> RouteBreakdown:
+        """Return the per segment breakdown of segments read with breakdown=True."""
+
+        if not self.with_breakdown:
+            raise ValueError("segments were read without breakdown")
+        return RouteBreakdown(
+            array(
+                "q",
+                [
+                    path.get("segmentId", -1) if (path := segment.get("path")) else -1
+                    for segment in self.results
+                ],
+            ),
+            self.cross_time,
+            self.cross_time_without_real_time,
+            self.length,
+            array("h", [segment.get("roadType", -1) for segment in self.results]),
+            array("b", [bool(segment.get("isToll")) for segment in self.results]),
+        )
+
+    def records(self) -> list[SegmentRecord]:
+        """Return the segments as compact records."""
+
+        return [
+            SegmentRecord(*fields)
+            for fields in zip(
+                self.x,
+                self.y,
+                self.length,
+                self.cross_time,
+                self.cross_time_without_real_time,
+                strict=True,
+            )
+        ]
+
+    def outside_bounds(
+        self, start_bounds: dict[str, float], end_bounds: dict[str, float]
+    ) -> list[bool]:
+        """Return a mask of the segments outside the start and end bounds."""
+
+        start_left, start_right, start_bottom, start_top = _bounds(start_bounds)
+        end_left, end_right, end_bottom, end_top = _bounds(end_bounds)
+        return [
+            not (
+                (path := segment.get("path"))
+                and (
+                    start_left < (x := path["x"]) < start_right
+                    or end_left < x < end_right
+                )
+                and (
+                    start_bottom < (y := path["y"]) < start_top
+                    or end_bottom < y < end_top
+                )
+            )
+            for segment in self.results
+        ]
+
+    def totals(
+        self,
+        start_bounds: dict[str, float],
+        end_bounds: dict[str, float],
+        bounded: bool = True,
+    ) -> RouteTotals:
+        """Return the totals of the route, with the bounded totals if bounded is set.
+
+        Durations are None when a segment lacks the cross time they are made of.
+        """
+
+        totals = _sum_totals(self.results)
+        if not bounded:
+            return RouteTotals(*totals)
+        outside = list(
+            compress(self.results, self.outside_bounds(start_bounds, end_bounds))
+        )
+        return RouteTotals(*totals, *_sum_totals(outside))
+
+
+def _sum_totals(
+    segments: list[dict[str, Any]],
+) -> tuple[float | None, float | None, float]:
+    """Return the durations in minutes and the distance in kilometers of segments."""
+
+    duration = _sum_cross_time(segments, *_CROSS_TIME)
+    without_real_time = _sum_cross_time(segments, *_CROSS_TIME_WITHOUT_REAL_TIME)
+    return (
+        None if duration is None else duration / 60.0,
+        None if without_real_time is None else without_real_time / 60.0,
+        sum(map(_LENGTH, segments)) / 1000.0,
+    )
+
+
+def _sum_cross_time(
+    segments: list[dict[str, Any]], key: str, legacy_key: str
+) -> float | None:
+    """Sum a cross time of segments, or return None if one lacks it."""
+
+    try:
+        return float(sum(map(_GETTERS[key], segments)))
+    except KeyError:
+        pass
+    try:
+        return float(
+            sum(
+                segment[key if "crossTime" in segment else legacy_key]
+                for segment in segments
+            )
+        )
+    except KeyError:
+        return None
+
+
+def _bounds(bounds: dict[str, float]) -> tuple[float, float, float, float]:
+    return (
+        bounds.get("left", 0),
+        bounds.get("right", 0),
+        bounds.get("bottom", 0),
+        bounds.get("top", 0),
+    )
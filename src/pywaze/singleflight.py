@@ -0,0 +1,46 @@
+"""Coalescing of concurrent identical requests."""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class SingleFlight(Generic[K]):
+    """Run one call per key and share its outcome with all concurrent callers.
+
+    The shared call runs in its own task. Cancelling a caller only stops that
+    caller from waiting, the call keeps running for the others.
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.coalesced = 0
+        self._inflight: dict[K, asyncio.Task[Any]] = {}
+
+    def __len__(self) -> int:
+        """Return the number of calls in flight."""
+        return len(self._inflight)
+
+    async def do(self, key: K, func: Callable[[], Awaitable[V]]) -> V:
+        """Await the in flight call for key or start a new one."""
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+        result: V = await asyncio.shield(task)
+        return result
+
+    def _forget(self, key: K, task: asyncio.Task[Any]) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved in case every caller went away.
+            task.exception()
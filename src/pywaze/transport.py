@@ -0,0 +1,137 @@
+"""Shared HTTP connection pools for the Waze servers."""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any
+from weakref import WeakKeyDictionary
+
+import httpx
+
+SEARCH_URL_PATTERN = "https://www.waze.com"
+ROUTING_URL_PATTERN = "https://*.waze.com"
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    """Connection pool limits of one endpoint."""
+
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+
+    def limits(self) -> httpx.Limits:
+        """Return the limits as httpx.Limits."""
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+@dataclass(frozen=True)
+class PoolStats:
+    """Connections of a pool, counted when requested."""
+
+    connections: int
+    idle_connections: int
+
+    @property
+    def active_connections(self) -> int:
+        """Return the number of connections serving a request."""
+        return self.connections - self.idle_connections
+
+
+@dataclass
+class _LoopClient:
+    client: httpx.AsyncClient
+    transports: dict[str, httpx.AsyncHTTPTransport] = field(default_factory=dict)
+
+
+class SharedTransport:
+    """HTTP clients shared by calculators, one per event loop.
+
+    Each client has a separate connection pool for the search and the routing
+    servers. http2 needs the h2 package (the http2 extra).
+    """
+
+    def __init__(
+        self,
+        search: PoolConfig | None = None,
+        routing: PoolConfig | None = None,
+        http2: bool = False,
+    ):
+        self.pools = {
+            "search": search or PoolConfig(),
+            "routing": routing or PoolConfig(),
+        }
+        self.http2 = http2
+        self._clients: WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopClient] = (
+            WeakKeyDictionary()
+        )
+
+    def client(self) -> httpx.AsyncClient:
+        """Return the client of the running event loop, creating it if needed."""
+
+        return self._loop_client().client
+
+    def _loop_client(self) -> _LoopClient:
+        loop = asyncio.get_running_loop()
+        loop_client = self._clients.get(loop)
+        if loop_client is None or loop_client.client.is_closed:
+            transports = {
+                endpoint: httpx.AsyncHTTPTransport(
+                    limits=pool.limits(), http2=self.http2
+                )
+                for endpoint, pool in self.pools.items()
+            }
+            client = httpx.AsyncClient(
+                mounts={
+                    SEARCH_URL_PATTERN: transports["search"],
+                    ROUTING_URL_PATTERN: transports["routing"],
+                },
+                http2=self.http2,
+            )
+            loop_client = self._clients[loop] = _LoopClient(client, transports)
+        return loop_client
+
+    def stats(self) -> dict[str, PoolStats]:
+        """Return the connection counts of the running event loop's pools.
+
+        The counts are read from httpcore's connection pool, which is not a
+        public API. This is best effort: pools whose connections cannot be read
+        are left out, so the result may be empty with other httpx versions.
+        """
+
+        stats = {}
+        for endpoint, transport in self._loop_client().transports.items():
+            pool: Any = getattr(transport, "_pool", None)
+            try:
+                connections = list(pool.connections)
+                idle_connections = sum(
+                    connection.is_idle() for connection in connections
+                )
+            except (AttributeError, TypeError):
+                continue
+            stats[endpoint] = PoolStats(
+                connections=len(connections), idle_connections=idle_connections
+            )
+        return stats
+
+    async def aclose(self) -> None:
+        """Close the client of the running event loop."""
+
+        loop_client = self._clients.pop(asyncio.get_running_loop(), None)
+        if loop_client is not None:
+            await loop_client.client.aclose()
+
+
+_default_transport: SharedTransport | None = None
+
+
+def default_transport() -> SharedTransport:
+    """Return the process wide transport used by calculators by default."""
+
+    global _default_transport
+    if _default_transport is None:
+        _default_transport = SharedTransport()
+    return _default_transport
@@ -12,6 +12,28 @@ from tests.const import (
 )
 
 
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Return the current fake time."""
+        return self.now
+
+
+@pytest.fixture
+def get_route_response() -> dict[str, Any]:
+    """Return a minimal route response with a single segment."""
+    return {
+        "response": {
+            "results": [{"length": 1000, "crossTime": 60}],
+            "streetNames": [],
+        }
+    }
+
+
 @pytest.fixture
 def get_route_mock(get_route_response: dict[str, Any], respx_mock: MockRouter):
     """Return the provided json response when calculating routes."""
@@ -0,0 +1,256 @@
+"""Tests for cache module."""
+
+import threading
+
+import pytest
+from pywaze import route_calculator
+from tests.conftest import FakeClock
+from pywaze.cache import GeocodeCache, RouteCache, SQLiteGeocodeStore
+
+
+def test_geocode_cache_lru_eviction():
+    """Evict the least recently used entry once maxsize is reached."""
+
+    cache = GeocodeCache(maxsize=2)
+    coords: route_calculator.Coords = {"lat": 1.0, "lon": 2.0, "bounds": {}}
+    keys = [
+        cache.make_key("EU", f"address {i}", {"lat": 0, "lon": 0}) for i in range(3)
+    ]
+
+    cache.set(keys[0], coords)
+    cache.set(keys[1], coords)
+    assert cache.get(keys[0]) == coords
+    cache.set(keys[2], coords)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == coords
+    assert cache.get(keys[2]) == coords
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_geocode_cache_ttl():
+    """Expire entries after their time to live."""
+
+    clock = FakeClock()
+    cache = GeocodeCache(ttl=10, clock=clock)
+    key = cache.make_key("EU", "Mainz", {"lat": 0, "lon": 0})
+    cache.set(key, {"lat": 1.0, "lon": 2.0, "bounds": {}})
+
+    clock.now = 10
+    assert cache.get(key) is not None
+    assert cache.age(key) == 10
+    clock.now = 10.5
+    assert cache.get(key) is None
+    assert len(cache) == 0
+
+
+def test_geocode_cache_key_normalization():
+    """Normalize address whitespace, case and base coordinate precision."""
+
+    cache = GeocodeCache(precision=2)
+    assert cache.make_key(
+        "EU", "  Kaiserstraße 30   Mainz", {"lat": 50.001, "lon": 8.004}
+    ) == cache.make_key("EU", "kaiserstraße 30 mainz", {"lat": 50.0, "lon": 8.0})
+    assert cache.make_key("EU", "Mainz", {"lat": 0, "lon": 0}) != cache.make_key(
+        "US", "Mainz", {"lat": 0, "lon": 0}
+    )
+
+
+def test_geocode_cache_returns_copies():
+    """Do not let callers mutate cached entries."""
+
+    cache = GeocodeCache()
+    key = cache.make_key("EU", "Mainz", {"lat": 0, "lon": 0})
+    cache.set(key, {"lat": 1.0, "lon": 2.0, "bounds": {"top": 1.0}})
+    cached = cache.get(key)
+    assert cached is not None
+    cached["bounds"]["top"] = 5.0
+    assert cache.get(key) == {"lat": 1.0, "lon": 2.0, "bounds": {"top": 1.0}}
+
+
+def test_sqlite_geocode_store_persists(tmp_path):
+    """Keep entries across store instances and expire old ones."""
+
+    clock = FakeClock()
+    path = tmp_path / "geocode.sqlite"
+    cache = GeocodeCache()
+    key = cache.make_key("EU", "Mainz", {"lat": 0, "lon": 0})
+    coords: route_calculator.Coords = {
+        "lat": 1.0,
+        "lon": 2.0,
+        "bounds": {"top": 3.0, "bottom": 1.0, "left": 0.0, "right": 4.0},
+    }
+
+    store = SQLiteGeocodeStore(path, ttl=100, clock=clock)
+    store.set(key, coords)
+    store.close()
+
+    store = SQLiteGeocodeStore(path, ttl=100, clock=clock)
+    assert store.get(key) == coords
+    assert list(store.items()) == [(key, coords)]
+
+    clock.now = 101
+    assert store.get(key) is None
+    assert store.compact() == 1
+    assert list(store.items()) == []
+    store.close()
+
+
+def test_geocode_cache_with_store(tmp_path):
+    """Fall through to the store on misses and warm up from it."""
+
+    path = tmp_path / "geocode.sqlite"
+    coords: route_calculator.Coords = {"lat": 1.0, "lon": 2.0, "bounds": {}}
+    store = SQLiteGeocodeStore(path)
+    cache = GeocodeCache(store=store)
+    keys = [
+        cache.make_key("EU", f"address {i}", {"lat": 0, "lon": 0}) for i in range(3)
+    ]
+    cache.set(keys[0], coords)
+    store.close()
+
+    store = SQLiteGeocodeStore(path)
+    restarted = GeocodeCache(store=store)
+    assert restarted.get(keys[0]) == coords
+    assert (restarted.hits, restarted.misses) == (1, 0)
+    store.set_many((key, coords) for key in keys[1:])
+    store.close()
+
+    store = SQLiteGeocodeStore(path)
+    warm = GeocodeCache(maxsize=2, store=store)
+    assert warm.warm_up() == 2
+    assert len(warm) == 2
+    store.close()
+
+
+async def test_address_to_coords_uses_geocode_cache(wiesbaden_to_coords_mock):
+    """Only query the search server once for repeated addresses."""
+
+    cache = GeocodeCache()
+    async with route_calculator.WazeRouteCalculator(geocode_cache=cache) as client:
+        first = await client.address_to_coords(
+            "Luisenstraße 30 65185 Wiesbaden, Germany"
+        )
+        second = await client.address_to_coords(
+            "luisenstraße 30  65185 Wiesbaden, Germany"
+        )
+
+    assert first == second
+    assert wiesbaden_to_coords_mock.call_count == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+async def test_address_to_coords_uses_store_off_the_event_loop(
+    tmp_path, wiesbaden_to_coords_mock
+):
+    """Read and write the geocode store in worker threads."""
+
+    threads = []
+
+    class RecordingStore(SQLiteGeocodeStore):
+        def get_entry(self, key):
+            threads.append(threading.get_ident())
+            return super().get_entry(key)
+
+        def entries(self):
+            threads.append(threading.get_ident())
+            return super().entries()
+
+        def set_many(self, items):
+            threads.append(threading.get_ident())
+            super().set_many(items)
+
+    store = RecordingStore(tmp_path / "geocode.sqlite")
+    address = "Luisenstraße 30 65185 Wiesbaden, Germany"
+    async with route_calculator.WazeRouteCalculator(
+        geocode_cache=GeocodeCache(store=store)
+    ) as client:
+        coords = await client.address_to_coords(address)
+    async with route_calculator.WazeRouteCalculator(
+        geocode_cache=GeocodeCache(store=store)
+    ) as client:
+        assert await client.address_to_coords(address) == coords
+
+    assert wiesbaden_to_coords_mock.call_count == 1
+    assert len(threads) == 3
+    assert await GeocodeCache(store=store).awarm_up() == 1
+    store.close()
+
+    assert len(threads) == 4
+    assert threading.get_ident() not in threads
+
+
+@pytest.mark.parametrize("warm_up", [False, True])
+def test_geocode_cache_keeps_store_expiry(tmp_path, warm_up: bool):
+    """Expire entries read from the store no later than in the store."""
+
+    clock = FakeClock()
+    key = ("EU", "mainz", 50.0, 8.3)
+    store = SQLiteGeocodeStore(tmp_path / "geocode.sqlite", ttl=100, clock=clock)
+    store.set(key, {"lat": 50.0, "lon": 8.2, "bounds": {}})
+    clock.now = 90
+    cache = GeocodeCache(ttl=1000, clock=clock, store=store)
+
+    if warm_up:
+        assert cache.warm_up() == 1
+    else:
+        assert cache.get(key) is not None
+    assert cache.age(key) == 990
+    clock.now = 101
+    assert cache._lookup(key) is None
+    assert cache.get(key) is None
+    store.close()
+
+
+def test_route_cache_key():
+    """Round coordinates and bucket the departure time."""
+
+    clock = FakeClock()
+    cache = RouteCache(bucket_seconds=300, precision=3, clock=clock)
+    start: route_calculator.BaseCoords = {"lat": 50.00031, "lon": 8.26231}
+    end: route_calculator.BaseCoords = {"lat": 50.08414, "lon": 8.24783}
+    options = {"nPaths": 1, "options": "AVOID_TOLL_ROADS:f"}
+
+    key = cache.make_key("server", start, end, options)
+    assert key == cache.make_key(
+        "server", {"lat": 50.0003, "lon": 8.2623}, end, dict(options)
+    )
+    assert key != cache.make_key("server", start, end, {**options, "nPaths": 3})
+    assert key != cache.make_key("server", start, end, options, time_delta=5)
+    clock.now = 300
+    assert key != cache.make_key("server", start, end, options)
+
+
+async def test_get_routes_uses_route_cache(get_route_mock):
+    """Serve fresh routes from the cache until they are too old."""
+
+    clock = FakeClock()
+    cache = RouteCache(max_age=60, clock=clock)
+    start: route_calculator.Coords = {"lat": 50.0, "lon": 8.2, "bounds": {}}
+    end: route_calculator.Coords = {"lat": 50.1, "lon": 8.3, "bounds": {}}
+
+    async with route_calculator.WazeRouteCalculator(route_cache=cache) as client:
+        first = await client.get_routes(start, end)
+        clock.now = 30
+        assert await client.get_routes(start, end) == first
+        await client.get_routes(start, end, avoid_toll_roads=True)
+        clock.now = 91
+        await client.get_routes(start, end)
+
+    assert get_route_mock.call_count == 3
+    assert cache.hit_ratio == pytest.approx(0.25)
+    assert len(cache) == 2
+
+
+def test_route_cache_returns_copies():
+    """Keep the cached list unchanged when a caller modifies its copy."""
+
+    cache = RouteCache()
+    routes = [{"routeName": "A"}]
+    cache.set(("key",), routes)
+    routes.clear()
+    cached = cache.get(("key",))
+    assert cached == [{"routeName": "A"}]
+
+    cached.append({"routeName": "B"})
+    assert cache.get(("key",)) == [{"routeName": "A"}]
@@ -0,0 +1,122 @@
+"""Tests for circuit module."""
+
+import httpx
+import pytest
+from httpx import Response
+from pywaze import route_calculator
+from pywaze.circuit import CircuitBreaker
+from respx import MockRouter
+
+from tests.conftest import FakeClock
+
+
+def test_circuit_breaker_opens_after_threshold():
+    """Refuse requests after consecutive failures."""
+
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    clock.now = 4
+    assert breaker.retry_after() == 6
+
+
+def test_circuit_breaker_success_resets_failures():
+    """Only count failures in a row."""
+
+    breaker = CircuitBreaker(failure_threshold=2, clock=FakeClock())
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_circuit_breaker_half_open_probe():
+    """Let a single probe through once the reset timeout passed."""
+
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+
+    clock.now = 10
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now = 20
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+
+def test_circuit_breaker_needs_threshold():
+    """Refuse thresholds below 1."""
+
+    with pytest.raises(ValueError):
+        CircuitBreaker(failure_threshold=0)
+
+
+async def test_calculator_fails_fast_while_circuit_is_open(
+    respx_mock: MockRouter, get_route_response
+):
+    """Stop sending routing requests after consecutive failures."""
+
+    clock = FakeClock()
+    route = respx_mock.get(
+        "https://routing-livemap-row.waze.com/RoutingManager/routingRequest"
+    ).mock(
+        side_effect=[
+            httpx.TimeoutException("Timeout"),
+            Response(503),
+            Response(200, json=get_route_response),
+        ]
+    )
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+
+    async with route_calculator.WazeRouteCalculator(
+        circuit_breakers={"routing": breaker}
+    ) as client:
+        with pytest.raises(route_calculator.WRCTimeoutError):
+            await client.calc_routes("50.0,8.2", "50.1,8.3")
+        with pytest.raises(route_calculator.WRCServerError):
+            await client.calc_routes("50.0,8.2", "50.1,8.3")
+        assert client.circuit_breakers["routing"].state == "open"
+
+        clock.now = 5
+        with pytest.raises(route_calculator.WRCCircuitOpenError) as error:
+            await client.calc_routes("50.0,8.2", "50.1,8.3")
+        assert error.value.retry_after == 5
+        assert route.call_count == 2
+
+        clock.now = 10
+        routes = await client.calc_routes("50.0,8.2", "50.1,8.3")
+
+    assert routes[0].duration == 1
+    assert breaker.state == "closed"
+
+
+async def test_calculator_circuits_are_per_endpoint(get_route_mock):
+    """Keep routing while the search circuit is open."""
+
+    search = CircuitBreaker(failure_threshold=1)
+    search.record_failure()
+
+    async with route_calculator.WazeRouteCalculator(
+        circuit_breakers={"search": search, "routing": CircuitBreaker()}
+    ) as client:
+        with pytest.raises(route_calculator.WRCCircuitOpenError):
+            await client.calc_routes("Wiesbaden", "50.1,8.3")
+        routes = await client.calc_routes("50.0,8.2", "50.1,8.3")
+
+    assert routes[0].duration == 1
@@ -0,0 +1,149 @@
+"""Tests for decoding module."""
+
+import json
+
+import pytest
+from httpx import Response
+from pywaze import route_calculator
+from pywaze.decoding import JSONDecoder, default_loads
+from pywaze.segments import RouteSegments
+from respx import MockRouter
+
+from tests.const import GET_ALL_ROUTES_RESPONSE
+
+
+def test_default_loads_prefers_orjson():
+    """Use orjson when it is installed."""
+
+    orjson = pytest.importorskip("orjson")
+    assert default_loads() is orjson.loads
+
+
+def test_json_decoder_stats():
+    """Count responses, bytes and decode time."""
+
+    decoder = JSONDecoder(json.loads)
+    assert decoder.decode(b'{"a": [1, 2]}') == {"a": [1, 2]}
+    assert decoder.decode(b"[]") == []
+
+    assert decoder.stats.responses == 2
+    assert decoder.stats.bytes == 15
+    assert decoder.stats.mean_seconds > 0
+    assert decoder.stats.peak_allocated == 0
+
+
+def test_json_decoder_measures_allocations():
+    """Trace the memory peak of decoding when asked to."""
+
+    decoder = JSONDecoder(measure_allocations=True)
+    decoder.decode(json.dumps([{"segment": index} for index in range(1000)]).encode())
+
+    assert decoder.stats.peak_allocated > 0
+
+
+def test_json_decoder_raises_value_error():
+    """Raise ValueError for invalid documents."""
+
+    with pytest.raises(ValueError):
+        JSONDecoder().decode(b"")
+
+
+async def test_calc_routes_uses_json_decoder(
+    respx_mock: MockRouter, get_route_response
+):
+    """Decode routing responses with the configured decoder."""
+
+    respx_mock.get(
+        "https://routing-livemap-row.waze.com/RoutingManager/routingRequest"
+    ).mock(return_value=Response(200, json=get_route_response))
+    calls = 0
+
+    def loads(content: bytes) -> object:
+        nonlocal calls
+        calls += 1
+        return json.loads(content)
+
+    decoder = JSONDecoder(loads)
+    async with route_calculator.WazeRouteCalculator(json_decoder=decoder) as client:
+        routes = await client.calc_routes("50.0,8.2", "50.1,8.3")
+
+    assert routes[0].duration == 1
+    assert calls == 1
+    assert decoder.stats.responses == 1
+
+
+async def test_calc_routes_empty_response(respx_mock: MockRouter):
+    """Raise WRCError for responses which are not JSON."""
+
+    respx_mock.get(
+        "https://routing-livemap-row.waze.com/RoutingManager/routingRequest"
+    ).mock(return_value=Response(200, content=b""))
+
+    async with route_calculator.WazeRouteCalculator() as client:
+        with pytest.raises(route_calculator.WRCError, match="empty response"):
+            await client.calc_routes("50.0,8.2", "50.1,8.3")
+
+
+def test_partial_routing_decode_skips_unused_fields():
+    """Keep only the routing fields used by pywaze."""
+
+    pytest.importorskip("msgspec")
+    content = json.dumps(GET_ALL_ROUTES_RESPONSE).encode()
+    full = JSONDecoder(json.loads).decode_routing(content)
+    partial = JSONDecoder(partial_routes=True).decode_routing(content)
+
+    full_route = full["alternatives"][0]["response"]
+    route = partial["alternatives"][0]["response"]
+    segment = route["results"][0]
+    assert "instruction" not in segment
+    assert "clientLaneSet" not in segment
+    assert "areas" not in route
+    assert set(segment["path"]) <= {"segmentId", "x", "y"}
+    assert route["streetNames"] == full_route["streetNames"]
+    assert RouteSegments(route["results"]).totals({}, {}) == RouteSegments(
+        full_route["results"]
+    ).totals({}, {})
+
+
+def test_partial_routing_decode_falls_back():
+    """Decode the whole document if it does not match the schema."""
+
+    pytest.importorskip("msgspec")
+    decoder = JSONDecoder(partial_routes=True)
+
+    assert decoder.decode_routing(b'{"response": "unexpected"}') == {
+        "response": "unexpected"
+    }
+    assert decoder.stats.fallbacks == 1
+    with pytest.raises(ValueError):
+        decoder.decode_routing(b"")
+
+
+def test_partial_routing_decode_accepts_null_names():
+    """Decode null route and street names without falling back."""
+
+    pytest.importorskip("msgspec")
+    decoder = JSONDecoder(partial_routes=True)
+    content = b'{"response": {"routeName": null, "streetNames": null, "results": []}}'
+
+    assert decoder.decode_routing(content) == {
+        "response": {"routeName": None, "streetNames": None, "results": []}
+    }
+    assert decoder.stats.fallbacks == 0
+
+
+async def test_get_routes_raw(respx_mock: MockRouter, get_route_response):
+    """Return the undecoded routing response."""
+
+    route = respx_mock.get(
+        "https://routing-livemap-row.waze.com/RoutingManager/routingRequest"
+    ).mock(return_value=Response(200, json=get_route_response))
+
+    async with route_calculator.WazeRouteCalculator() as client:
+        content = await client.get_routes_raw(
+            {"lat": 50.0, "lon": 8.2, "bounds": {}},
+            {"lat": 50.1, "lon": 8.3, "bounds": {}},
+        )
+
+    assert json.loads(content) == get_route_response
+    assert route.calls.last.request.url.params["from"] == "x:8.2 y:50.0"
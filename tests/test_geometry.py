@@ -0,0 +1,59 @@
+"""Tests for geometry module."""
+
+from array import array
+from typing import Any
+
+import pytest
+from pywaze.geometry import RouteGeometry, encode_polyline
+from tests.const import GET_ALL_ROUTES_RESPONSE, GET_ROUTE_RESPONSE_COORDS
+
+
+def test_encode_polyline():
+    """Encode the example of the polyline algorithm documentation."""
+
+    lats = array("d", [38.5, 40.7, 43.252])
+    lons = array("d", [-120.2, -120.95, -126.453])
+
+    assert encode_polyline(lats, lons) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+def test_geometry_from_route_falls_back_to_segments():
+    """Use the segment path points without a coordinates list."""
+
+    alternatives: Any = GET_ALL_ROUTES_RESPONSE["alternatives"]
+    route = alternatives[0]["response"]
+    geometry = RouteGeometry.from_route(route)
+
+    assert len(geometry) == len(route["results"])
+    assert geometry.lats[0] == route["results"][0]["path"]["y"]
+
+
+def test_geometry_simplify():
+    """Drop points close to the simplified line."""
+
+    geometry = RouteGeometry(
+        array("d", [0.0, 0.00001, 0.0, 1.0, 2.0]),
+        array("d", [0.0, 1.0, 2.0, 3.0, 3.0]),
+    )
+
+    simplified = geometry.simplify(0.001)
+    assert list(simplified) == [(0.0, 0.0), (0.0, 2.0), (1.0, 3.0), (2.0, 3.0)]
+    assert len(geometry.simplify(0)) == 5
+
+
+def test_geometry_simplify_keeps_route_ends():
+    """Keep the first and last point of a real route."""
+
+    geometry = RouteGeometry.from_route(GET_ROUTE_RESPONSE_COORDS)
+    simplified = geometry.simplify(0.001)
+
+    assert 2 <= len(simplified) < len(geometry)
+    assert simplified.lats[0] == geometry.lats[0]
+    assert simplified.lons[-1] == geometry.lons[-1]
+
+
+def test_geometry_needs_pairs():
+    """Refuse latitudes and longitudes of different lengths."""
+
+    with pytest.raises(ValueError):
+        RouteGeometry(array("d", [1.0]), array("d"))
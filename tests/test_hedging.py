@@ -0,0 +1,109 @@
+"""Tests for hedging module."""
+
+import asyncio
+
+import httpx
+import pytest
+from httpx import Response
+from respx import MockRouter
+from pywaze import route_calculator
+from pywaze.hedging import HedgePolicy
+
+
+def test_hedge_policy_delay():
+    """Use the initial delay until enough latencies were recorded."""
+
+    policy = HedgePolicy(percentile=0.9, initial_delay=2, min_delay=0.1, min_samples=10)
+    assert policy.delay() == 2
+    for latency in range(1, 11):
+        policy.record(latency / 100)
+    assert policy.delay() == pytest.approx(0.1)
+    policy.record(5)
+    assert policy.delay() == pytest.approx(0.1)
+    policy.record(6)
+    assert policy.delay() == 5
+
+
+async def test_hedge_wins_and_cancels_slow_request():
+    """Return the first response and cancel the slow request."""
+
+    policy = HedgePolicy(initial_delay=0.01, max_ratio=1)
+    started: list[asyncio.Event] = []
+    cancelled = asyncio.Event()
+
+    async def request() -> int:
+        call = len(started)
+        started.append(asyncio.Event())
+        if call == 0:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+        return call
+
+    assert await policy.call(request) == 1
+    assert cancelled.is_set()
+    assert (policy.requests, policy.hedges, policy.hedge_wins) == (1, 1, 1)
+
+
+async def test_hedge_rate_is_capped():
+    """Do not hedge more than max_ratio of the requests."""
+
+    policy = HedgePolicy(initial_delay=0, max_ratio=0.5)
+    calls = 0
+
+    async def request() -> None:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.001)
+
+    for _ in range(4):
+        await policy.call(request)
+
+    assert policy.hedges == 2
+    assert calls == 6
+
+
+async def test_hedge_raises_primary_error_when_all_fail():
+    """Raise the error of the primary request when every request failed."""
+
+    policy = HedgePolicy(initial_delay=0, max_ratio=1)
+    calls = 0
+
+    async def request() -> None:
+        nonlocal calls
+        calls += 1
+        call = calls
+        await asyncio.sleep(0.001)
+        raise route_calculator.WRCError(f"failure {call}")
+
+    with pytest.raises(route_calculator.WRCError, match="failure 1"):
+        await policy.call(request)
+    assert calls == 2
+
+
+async def test_get_routes_hedges_routing_requests(
+    respx_mock: MockRouter, get_route_response
+):
+    """Send a hedge for slow routing requests."""
+
+    sent = 0
+
+    async def slow_response(request: httpx.Request) -> Response:
+        nonlocal sent
+        sent += 1
+        await asyncio.sleep(0.01)
+        return Response(200, json=get_route_response)
+
+    respx_mock.get(
+        "https://routing-livemap-row.waze.com/RoutingManager/routingRequest"
+    ).mock(side_effect=slow_response)
+    policy = HedgePolicy(initial_delay=0.001, max_ratio=1)
+
+    async with route_calculator.WazeRouteCalculator(hedge_policy=policy) as client:
+        routes = await client.calc_routes("50.0,8.2", "50.1,8.3")
+
+    assert routes[0].duration == 1
+    assert policy.hedges == 1
+    assert sent == 2
@@ -0,0 +1,98 @@
+"""Tests for matrix module."""
+
+import math
+
+import pytest
+from httpx import Response
+from pywaze import route_calculator
+from pywaze.matrix import RouteMatrix
+from respx import MockRouter
+
+
+@pytest.fixture
+def get_route_response():
+    """Route response used by the routing mock."""
+    return {
+        "response": {
+            "results": [{"length": 1500, "crossTime": 90}],
+            "streetNames": [],
+        }
+    }
+
+
+@pytest.mark.usefixtures("get_route_mock")
+async def test_calc_matrix(wiesbaden_to_coords_mock, respx_mock: MockRouter):
+    """Resolve every endpoint once and fill the matrix row major."""
+
+    respx_mock.route(path="/row-SearchServer/mozi", params={"q": "Nowhere"}).mock(
+        return_value=Response(200, json=[])
+    )
+    wiesbaden = "Luisenstraße 30 65185 Wiesbaden, Germany"
+    origins = ["50.0,8.2", wiesbaden, "Nowhere"]
+    destinations = [wiesbaden, "50.1,8.3"]
+
+    async with route_calculator.WazeRouteCalculator(coalesce_requests=False) as client:
+        matrix = await client.calc_matrix(origins, destinations, concurrency=2)
+
+    assert matrix.shape == (3, 2)
+    assert wiesbaden_to_coords_mock.call_count == 1
+    assert list(matrix.durations[:4]) == [1.5] * 4
+    assert list(matrix.distances[:4]) == [1.5] * 4
+    assert math.isnan(matrix.duration(2, 0))
+    assert math.isnan(matrix.distance(2, 1))
+    assert set(matrix.errors) == {(2, 0), (2, 1)}
+    assert isinstance(matrix.errors[2, 0], route_calculator.WRCError)
+
+
+@pytest.mark.usefixtures("get_route_mock")
+async def test_calc_matrix_coordinate_endpoints(monkeypatch: pytest.MonkeyPatch):
+    """Accept tuple and dict endpoints and resolve equal coordinates once."""
+
+    destination: route_calculator.Coords = {
+        "lat": 50.1,
+        "lon": 8.3,
+        "bounds": {"left": 8.0},
+    }
+    origins: list[route_calculator.Location] = [(50.0, 8.2), {"lat": 50.0, "lon": 8.2}]
+    destinations: list[route_calculator.Location] = [destination]
+
+    async with route_calculator.WazeRouteCalculator() as client:
+        ensure_coords = client._ensure_coords
+        resolved = []
+
+        async def record(location, base_coords=None):
+            resolved.append(location)
+            return await ensure_coords(location, base_coords)
+
+        monkeypatch.setattr(client, "_ensure_coords", record)
+        matrix = await client.calc_matrix(origins, destinations)
+
+    assert matrix.origins == origins
+    assert resolved == [(50.0, 8.2), destination]
+    assert list(matrix.durations) == [1.5, 1.5]
+    assert not matrix.errors
+
+
+async def test_calc_matrix_needs_concurrency():
+    """Refuse a concurrency below 1 instead of waiting forever."""
+
+    async with route_calculator.WazeRouteCalculator() as client:
+        with pytest.raises(ValueError):
+            await client.calc_matrix(["50.0,8.2"], ["50.1,8.3"], concurrency=0)
+
+
+def test_route_matrix_to_numpy():
+    """Return 2D NumPy views of the matrix."""
+
+    np = pytest.importorskip("numpy")
+    matrix = RouteMatrix.empty(["a", "b"], ["c", "d", "e"])
+    matrix.set(1, 2, 3.0, 4.0)
+
+    durations, distances = matrix.to_numpy()
+
+    assert durations.shape == (2, 3)
+    assert durations[1, 2] == 3.0
+    assert distances[1, 2] == 4.0
+    assert np.isnan(durations[0, 0])
+    with pytest.raises(IndexError):
+        matrix.set(0, 3, 1.0, 1.0)
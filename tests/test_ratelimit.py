@@ -0,0 +1,76 @@
+"""Tests for ratelimit module."""
+
+import asyncio
+
+import pytest
+from pywaze import route_calculator
+from tests.conftest import FakeClock
+from pywaze.ratelimit import RateLimiter, TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    """Clock which asyncio.sleep in the ratelimit module advances."""
+
+    fake_clock = FakeClock()
+
+    async def sleep(seconds: float) -> None:
+        fake_clock.now += seconds
+
+    monkeypatch.setattr("pywaze.ratelimit.asyncio.sleep", sleep)
+    return fake_clock
+
+
+async def test_token_bucket(clock: FakeClock):
+    """Allow bursts up to capacity and then wait for refills."""
+
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+
+    assert await bucket.acquire() == 0
+    assert await bucket.acquire() == 0
+    assert bucket.wait_time() == pytest.approx(0.5)
+    assert await bucket.acquire() == pytest.approx(0.5)
+    assert clock.now == pytest.approx(0.5)
+    clock.now = 10
+    assert bucket.wait_time() == 0
+
+
+async def test_token_bucket_cancelled_acquire_returns_tokens():
+    """Give reserved tokens back when a waiting caller is cancelled."""
+
+    bucket = TokenBucket(rate=1, capacity=1)
+    await bucket.acquire()
+    waiter = asyncio.create_task(bucket.acquire())
+    await asyncio.sleep(0)
+    assert bucket.wait_time() > 1
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert bucket.wait_time() <= 1
+
+
+def test_token_bucket_requires_positive_rate():
+    """Reject a rate of zero."""
+
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+async def test_rate_limiter_shared_between_calculators(
+    clock: FakeClock, get_route_mock
+):
+    """Apply one routing budget to every calculator using the limiter."""
+
+    limiter = RateLimiter(routing=TokenBucket(rate=1, capacity=1, clock=clock))
+    calculators = [
+        route_calculator.WazeRouteCalculator(rate_limiter=limiter) for _ in range(2)
+    ]
+
+    for calculator in calculators:
+        async with calculator:
+            await calculator.calc_routes("50.0,8.2", "50.1,8.3")
+
+    assert get_route_mock.call_count == 2
+    assert clock.now == pytest.approx(1)
+    assert limiter.wait_time("routing") == pytest.approx(1)
+    assert limiter.wait_time("search") == 0
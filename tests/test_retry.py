@@ -0,0 +1,151 @@
+"""Tests for retry module."""
+
+import asyncio
+
+import httpx
+import pytest
+from httpx import Response
+from pywaze import route_calculator
+from pywaze.retry import RetryPolicy
+from respx import MockRouter
+
+ROUTING_URL = "https://routing-livemap-row.waze.com/RoutingManager/routingRequest"
+
+
+@pytest.fixture(autouse=True)
+def sleeps(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    """Record the backoff delays instead of sleeping."""
+
+    delays: list[float] = []
+
+    async def sleep(seconds: float) -> None:
+        delays.append(seconds)
+
+    monkeypatch.setattr("pywaze.retry.asyncio.sleep", sleep)
+    return delays
+
+
+def test_retry_policy_delay():
+    """Back off exponentially up to backoff_max."""
+
+    policy = RetryPolicy(backoff_base=1, backoff_max=5, jitter=0)
+    assert [policy.delay(retry) for retry in range(1, 5)] == [1, 2, 4, 5]
+    jittered = RetryPolicy(backoff_base=1, jitter=0.5)
+    assert all(0.5 <= jittered.delay(1) <= 1 for _ in range(20))
+
+
+async def test_get_routes_retries_transient_errors(
+    respx_mock: MockRouter, get_route_response, sleeps: list[float]
+):
+    """Retry timeouts and server errors until a response arrives."""
+
+    route = respx_mock.get(ROUTING_URL).mock(
+        side_effect=[
+            httpx.TimeoutException("Timeout"),
+            Response(503, text="Service Unavailable"),
+            Response(200, json=get_route_response),
+        ]
+    )
+    policy = RetryPolicy(backoff_base=1, jitter=0)
+
+    async with route_calculator.WazeRouteCalculator(retry_policy=policy) as client:
+        routes = await client.calc_routes("50.0,8.2", "50.1,8.3")
+
+    assert routes[0].duration == 1
+    assert route.call_count == 3
+    assert sleeps == [1, 2]
+    assert policy.attempts == {("routing", 1): 1, ("routing", 2): 1, ("routing", 3): 1}
+
+
+async def test_address_to_coords_gives_up_after_max_attempts(respx_mock: MockRouter):
+    """Raise the last error once every attempt failed."""
+
+    route = respx_mock.get(path="/row-SearchServer/mozi").mock(
+        return_value=Response(500, text="Internal Server Error")
+    )
+    policy = RetryPolicy(max_attempts=2)
+
+    async with route_calculator.WazeRouteCalculator(retry_policy=policy) as client:
+        with pytest.raises(route_calculator.WRCServerError) as error:
+            await client.address_to_coords("Mainz")
+
+    assert error.value.status_code == 500
+    assert route.call_count == 2
+
+
+async def test_retry_policy_skips_permanent_errors(respx_mock: MockRouter):
+    """Do not retry errors reported by Waze in a successful response."""
+
+    route = respx_mock.get(ROUTING_URL).mock(
+        return_value=Response(200, json={"error": "No route"})
+    )
+
+    async with route_calculator.WazeRouteCalculator(
+        retry_policy=RetryPolicy()
+    ) as client:
+        with pytest.raises(route_calculator.WRCError):
+            await client.calc_routes("50.0,8.2", "50.1,8.3")
+
+    assert route.call_count == 1
+
+
+async def test_retry_policy_deadline(respx_mock: MockRouter):
+    """Stop retrying when the next delay would exceed the deadline."""
+
+    route = respx_mock.get(ROUTING_URL).mock(
+        side_effect=httpx.TimeoutException("Timeout")
+    )
+    policy = RetryPolicy(max_attempts=5, backoff_base=1, jitter=0, deadline=1.5)
+
+    async with route_calculator.WazeRouteCalculator(retry_policy=policy) as client:
+        with pytest.raises(route_calculator.WRCTimeoutError):
+            await client.calc_routes("50.0,8.2", "50.1,8.3")
+
+    assert route.call_count == 2
+
+
+async def test_retry_policy_switches_failover_host_per_attempt(
+    respx_mock: MockRouter, get_route_response
+):
+    """Send every retry to the next healthy host and count each failure."""
+
+    mirror_url = "https://routing-mirror.example/RoutingManager/routingRequest"
+    primary = respx_mock.get(ROUTING_URL).mock(
+        side_effect=httpx.TimeoutException("Timeout")
+    )
+    mirror = respx_mock.get(mirror_url).mock(
+        side_effect=[
+            Response(503, text="unavailable"),
+            Response(200, json=get_route_response),
+        ]
+    )
+    policy = RetryPolicy(max_attempts=4)
+
+    async with route_calculator.WazeRouteCalculator(
+        retry_policy=policy, failover=True, routing_hosts=[ROUTING_URL, mirror_url]
+    ) as client:
+        routes = await client.calc_routes("50.0,8.2", "50.1,8.3")
+
+    assert routes[0].duration == 1
+    assert primary.call_count == 2
+    assert mirror.call_count == 2
+    assert client.host_breakers[ROUTING_URL].failures == 2
+    assert client.host_breakers[mirror_url].failures == 0
+    assert sum(policy.attempts.values()) == 4
+
+
+async def test_retry_policy_deadline_cancels_attempt(respx_mock: MockRouter):
+    """Cancel an attempt still running when the deadline passes."""
+
+    async def hang(request: httpx.Request) -> Response:
+        await asyncio.Event().wait()
+        return Response(200)
+
+    respx_mock.get(ROUTING_URL).mock(side_effect=hang)
+    policy = RetryPolicy(deadline=0.05)
+
+    async with route_calculator.WazeRouteCalculator(retry_policy=policy) as client:
+        with pytest.raises(route_calculator.WRCTimeoutError, match="deadline"):
+            await client.calc_routes("50.0,8.2", "50.1,8.3")
+
+    assert sum(policy.attempts.values()) == 1
@@ -1,8 +1,18 @@
 """Tests for route_calculator module."""
 
+import asyncio
+import dataclasses
+import gc
+import logging
+import tracemalloc
+from collections.abc import AsyncIterator
+from typing import Any
+
 from httpx import Response
+import httpx
 import pytest
 from pywaze import route_calculator
+from pywaze.decoding import JSONDecoder
 from respx import MockRouter
 from tests.const import (
     ADDRESS_TO_COORDS_RESPONSE_WIESBADEN,
@@ -12,6 +22,9 @@ from tests.const import (
     GET_ALL_ROUTES_RESPONSE,
 )
 
+ROW_ROUTING_URL = "https://routing-livemap-row.waze.com/RoutingManager/routingRequest"
+MIRROR_ROUTING_URL = "https://routing-mirror.example/RoutingManager/routingRequest"
+
 
 @pytest.mark.parametrize(
     (
@@ -244,8 +257,8 @@ async def test_calc_route_info(
             assert routes[alternative].duration == expected_route_times[alternative]
             assert routes[alternative].distance == expected_route_distances[alternative]
             assert routes[alternative].name == expected_route_names[alternative]
-            assert (
-                routes[alternative].street_names == expected_street_names[alternative]
+            assert routes[alternative].street_names == tuple(
+                expected_street_names[alternative]
             )
 
 
@@ -340,3 +353,548 @@ async def test_calc_route_info_timeout():
                 "50.00332659227126,8.262322651915843",
                 "50.08414976707619,8.247836017342934",
             )
+
+
+@pytest.mark.parametrize("region", ["US", "NA", "EU", "IL", "AU"])
+def test_failover_hosts_serve_the_region_map(region: str):
+    """Only fail over to hosts serving the map of the region."""
+
+    client = route_calculator.WazeRouteCalculator(region=region, failover=True)
+
+    assert list(client.host_breakers) == [client.ROUTING_SERVERS[region]]
+
+
+async def test_calc_routes_fails_over_to_alternate_host(
+    respx_mock: MockRouter, get_route_response
+):
+    """Retry a timed out routing request on the next host and track health."""
+
+    primary = respx_mock.get(ROW_ROUTING_URL).mock(
+        side_effect=httpx.TimeoutException("Timeout")
+    )
+    alternate = respx_mock.get(MIRROR_ROUTING_URL).mock(
+        return_value=Response(200, json=get_route_response)
+    )
+
+    async with route_calculator.WazeRouteCalculator(
+        failover=True, routing_hosts=[ROW_ROUTING_URL, MIRROR_ROUTING_URL]
+    ) as client:
+        for breaker in client.host_breakers.values():
+            breaker.failure_threshold = 2
+        for _ in range(3):
+            routes = await client.calc_routes("50.0,8.2", "50.1,8.3")
+            assert routes[0].duration == 1
+
+    assert primary.call_count == 2
+    assert alternate.call_count == 3
+    breakers = list(client.host_breakers.values())
+    assert [breaker.state for breaker in breakers] == ["open", "closed"]
+
+
+async def test_get_routes_raw_fails_over_to_alternate_host(
+    respx_mock: MockRouter, get_route_response
+):
+    """Send undecoded routing requests to a healthy host too."""
+
+    respx_mock.get(ROW_ROUTING_URL).mock(side_effect=httpx.TimeoutException("Timeout"))
+    alternate = respx_mock.get(MIRROR_ROUTING_URL).mock(
+        return_value=Response(200, json=get_route_response)
+    )
+
+    async with route_calculator.WazeRouteCalculator(
+        failover=True, routing_hosts=[ROW_ROUTING_URL, MIRROR_ROUTING_URL]
+    ) as client:
+        content = await client.get_routes_raw(
+            {"lat": 50.0, "lon": 8.2, "bounds": {}},
+            {"lat": 50.1, "lon": 8.3, "bounds": {}},
+        )
+
+    assert content == alternate.calls.last.response.content
+    assert alternate.call_count == 1
+
+
+@pytest.mark.usefixtures("timeout_mock")
+async def test_calc_routes_failover_raises_last_error(respx_mock: MockRouter):
+    """Raise the error of the last host tried."""
+
+    respx_mock.get(MIRROR_ROUTING_URL).mock(
+        return_value=Response(503, text="unavailable")
+    )
+
+    async with route_calculator.WazeRouteCalculator(
+        failover=True, routing_hosts=[ROW_ROUTING_URL, MIRROR_ROUTING_URL]
+    ) as client:
+        with pytest.raises(route_calculator.WRCServerError):
+            await client.calc_routes("50.0,8.2", "50.1,8.3")
+        for breaker in client.host_breakers.values():
+            breaker.opened_at = breaker.clock()
+        with pytest.raises(route_calculator.WRCError, match="All routing hosts"):
+            await client.calc_routes("50.0,8.2", "50.1,8.3")
+
+
+@pytest.mark.parametrize(
+    ("location", "expected"),
+    (
+        ("50.0,8.2", {"lat": 50.0, "lon": 8.2, "bounds": {}}),
+        ("-33.86, -151", {"lat": -33.86, "lon": -151.0, "bounds": {}}),
+        ((50.0, 8.2), {"lat": 50.0, "lon": 8.2, "bounds": {}}),
+        ({"lat": 50, "lon": 8}, {"lat": 50.0, "lon": 8.0, "bounds": {}}),
+        ("Wiesbaden", None),
+        ("50,8", None),
+        ("", None),
+    ),
+)
+def test_parse_coords(
+    location: route_calculator.Location, expected: route_calculator.Coords | None
+):
+    """Classify and parse a location in one step."""
+
+    assert route_calculator.WazeRouteCalculator().parse_coords(location) == expected
+
+
+def test_parse_coords_skips_regex_for_addresses(monkeypatch: pytest.MonkeyPatch):
+    """Detect addresses by their characters before running the regex."""
+
+    client = route_calculator.WazeRouteCalculator()
+    monkeypatch.setattr(client, "COORD_MATCH", None)
+
+    assert client.parse_coords("Luisenstraße 30 65185 Wiesbaden") is None
+    assert not client.already_coords("Mainz")
+
+
+async def test_calc_routes_accepts_coordinate_pairs(get_route_mock):
+    """Route between tuples and dicts without parsing strings."""
+
+    async with route_calculator.WazeRouteCalculator() as client:
+        routes = await client.calc_routes((50.0, 8.2), {"lat": 50.1, "lon": 8.3})
+
+    assert routes[0].duration == 1
+    params = get_route_mock.calls.last.request.url.params
+    assert params["from"] == "x:8.2 y:50.0"
+    assert params["to"] == "x:8.3 y:50.1"
+
+
+async def test_calc_routes_many(
+    wiesbaden_to_coords_mock, mainz_to_coords_mock, respx_mock: MockRouter
+):
+    """Resolve shared addresses once and isolate errors per pair."""
+
+    route_response = {
+        "response": {
+            "results": [{"length": 1000, "crossTime": 60}],
+            "streetNames": [],
+        }
+    }
+    routing_route = respx_mock.get(
+        "https://routing-livemap-row.waze.com/RoutingManager/routingRequest"
+    ).mock(return_value=Response(200, json=route_response))
+    respx_mock.route(path="/row-SearchServer/mozi", params={"q": "Nowhere"}).mock(
+        return_value=Response(200, json=[])
+    )
+    mainz = "Kaiserstraße 30 55116 Mainz, Germany"
+    wiesbaden = "Luisenstraße 30 65185 Wiesbaden, Germany"
+    pairs = [(mainz, wiesbaden), (mainz, "Nowhere"), (wiesbaden, mainz)] * 2
+
+    async with route_calculator.WazeRouteCalculator(coalesce_requests=False) as client:
+        results = await client.calc_routes_many(pairs, concurrency=1)
+
+    assert len(results) == 6
+    for index, result in enumerate(results):
+        if index % 3 == 1:
+            assert isinstance(result, route_calculator.WRCError)
+        else:
+            assert isinstance(result, list)
+            assert result[0].duration == 1
+    assert mainz_to_coords_mock.call_count == 1
+    assert wiesbaden_to_coords_mock.call_count == 1
+    assert routing_route.call_count == 4
+
+
+@pytest.mark.parametrize("get_route_response", [GET_ROUTE_RESPONSE_COORDS])
+async def test_calc_routes_many_coordinate_pairs(get_route_mock):
+    """Accept tuple and dict endpoints in batch pairs."""
+
+    async with route_calculator.WazeRouteCalculator() as client:
+        results = await client.calc_routes_many(
+            [((50.0, 8.2), {"lat": 50.1, "lon": 8.3})]
+        )
+
+    assert isinstance(results[0], list)
+    params = get_route_mock.calls.last.request.url.params
+    assert params["from"] == "x:8.2 y:50.0"
+    assert params["to"] == "x:8.3 y:50.1"
+
+
+def test_add_up_route_missing_cross_time():
+    """Raise instead of returning NaN when the selected cross time is missing."""
+
+    results = [{"length": 1000, "crossTime": 60}]
+    client = route_calculator.WazeRouteCalculator()
+
+    assert client._add_up_route(results, {}, {}) == (1.0, 1.0)
+    with pytest.raises(KeyError):
+        client._add_up_route(results, {}, {}, real_time=False)
+
+
+async def test_calc_routes_many_needs_concurrency():
+    """Refuse a concurrency below 1 instead of waiting forever."""
+
+    async with route_calculator.WazeRouteCalculator() as client:
+        with pytest.raises(ValueError):
+            await client.calc_routes_many([("50.0,8.2", "50.1,8.3")], concurrency=0)
+
+
+async def test_calc_routes_many_cancels_lookups(monkeypatch: pytest.MonkeyPatch):
+    """Cancel pending address lookups when the batch is cancelled."""
+
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def hang(address: str, **kwargs: Any) -> None:
+        started.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async with route_calculator.WazeRouteCalculator() as client:
+        monkeypatch.setattr(client, "address_to_coords", hang)
+        batch = asyncio.ensure_future(
+            client.calc_routes_many([("Wiesbaden", "50.1,8.3")])
+        )
+        await started.wait()
+        batch.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await batch
+        await asyncio.wait_for(cancelled.wait(), 1)
+
+
+async def test_stream_routes(respx_mock: MockRouter):
+    """Pull pairs lazily and yield every pair with its input index."""
+
+    route_response = {
+        "response": {
+            "results": [{"length": 1000, "crossTime": 60}],
+            "streetNames": [],
+        }
+    }
+    respx_mock.get(
+        "https://routing-livemap-row.waze.com/RoutingManager/routingRequest"
+    ).mock(return_value=Response(200, json=route_response))
+    pulled = 0
+
+    async def pairs() -> AsyncIterator[tuple[str, str]]:
+        nonlocal pulled
+        for index in range(5):
+            pulled += 1
+            yield f"50.{index},8.2", "50.0,8.3"
+
+    async with route_calculator.WazeRouteCalculator() as client:
+        stream = client.stream_routes(pairs(), concurrency=2)
+        first_index, first_result = await anext(stream)
+        assert pulled <= 3
+        results = [(first_index, first_result)] + [item async for item in stream]
+
+    assert sorted(index for index, _ in results) == [0, 1, 2, 3, 4]
+    assert all(isinstance(result, list) for _, result in results)
+
+
+async def test_stream_routes_needs_concurrency():
+    """Refuse a concurrency below 1 instead of yielding nothing."""
+
+    async with route_calculator.WazeRouteCalculator() as client:
+        with pytest.raises(ValueError):
+            async for _ in client.stream_routes(
+                [("50.0,8.2", "50.1,8.3")], concurrency=0
+            ):
+                pass
+
+
+async def test_stream_routes_sync_iterable(respx_mock: MockRouter):
+    """Accept plain iterables and isolate errors per pair."""
+
+    respx_mock.get(
+        "https://routing-livemap-row.waze.com/RoutingManager/routingRequest"
+    ).mock(return_value=Response(200, json={"error": "No route"}))
+
+    async with route_calculator.WazeRouteCalculator() as client:
+        results = [
+            item
+            async for item in client.stream_routes(iter([("50.0,8.2", "50.1,8.3")]))
+        ]
+
+    assert len(results) == 1
+    assert results[0][0] == 0
+    assert isinstance(results[0][1], route_calculator.WRCError)
+
+
+@pytest.mark.parametrize("get_route_response", [GET_ROUTE_RESPONSE_COORDS])
+@pytest.mark.usefixtures("get_route_mock")
+async def test_calc_routes_returns_all_totals():
+    """Return real time and historical totals from a single request."""
+
+    async with route_calculator.WazeRouteCalculator() as client:
+        routes = await client.calc_routes(
+            "50.00332659227126,8.262322651915843",
+            "50.08414976707619,8.247836017342934",
+        )
+        historical = await client.calc_routes(
+            "50.00332659227126,8.262322651915843",
+            "50.08414976707619,8.247836017342934",
+            real_time=False,
+        )
+
+    totals = routes[0].totals
+    assert totals is not None
+    assert totals.duration == routes[0].duration
+    assert totals.duration_without_real_time == historical[0].duration
+    assert totals.distance == routes[0].distance
+    assert totals.bounded_distance is None
+
+
+@pytest.mark.parametrize("get_route_response", [GET_ROUTE_RESPONSE_COORDS])
+@pytest.mark.usefixtures("get_route_mock")
+async def test_calc_routes_bounded_totals_with_stop_at_bounds():
+    """Compute the bounded totals in the same pass when stop_at_bounds is set."""
+
+    async with route_calculator.WazeRouteCalculator() as client:
+        routes = await client.calc_routes("50.0,8.2", "50.1,8.3", stop_at_bounds=True)
+
+    totals = routes[0].totals
+    assert totals is not None
+    assert totals.bounded_distance == routes[0].distance
+    assert totals.bounded_duration == routes[0].duration
+    assert totals.bounded_duration_without_real_time is not None
+
+
+@pytest.mark.parametrize("get_route_response", [GET_ROUTE_RESPONSE_COORDS])
+@pytest.mark.usefixtures("get_route_mock")
+async def test_calc_routes_results_are_compact():
+    """Store results without __dict__ and share interned street names."""
+
+    async with route_calculator.WazeRouteCalculator() as client:
+        first = [
+            route.detach() for route in await client.calc_routes("50.0,8.2", "50.1,8.3")
+        ]
+        second = await client.calc_routes("50.0,8.2", "50.1,8.3", real_time=False)
+        tracemalloc.start()
+        try:
+            third = [
+                route.detach()
+                for route in await client.calc_routes("50.0,8.2", "50.1,8.3")
+            ]
+            names = len(third[0].street_names)
+            await asyncio.sleep(0)
+            gc.collect()
+            retained, _ = tracemalloc.get_traced_memory()
+            del third
+            gc.collect()
+            released, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    route = first[0]
+    assert not hasattr(route, "__dict__")
+    assert not hasattr(route.totals, "__dict__")
+    # The result, its RouteTotals and floats, and the street names tuple. The
+    # names themselves are interned and shared with the earlier results.
+    assert retained - released <= 96 + 80 + 3 * 24 + 40 + 8 * names + 32
+    assert isinstance(route.street_names, tuple)
+    assert all(
+        name is other
+        for name, other in zip(route.street_names, second[0].street_names, strict=True)
+    )
+
+
+@pytest.mark.parametrize("get_route_response", [GET_ROUTE_RESPONSE_COORDS])
+@pytest.mark.usefixtures("get_route_mock")
+async def test_calc_routes_breakdown():
+    """Return per segment data matching the totals when asked to."""
+
+    async with route_calculator.WazeRouteCalculator() as client:
+        routes = await client.calc_routes("50.0,8.2", "50.1,8.3", breakdown=True)
+
+    breakdown = routes[0].breakdown
+    assert breakdown is not None
+    assert all(segment_id > 0 for segment_id in breakdown.segment_id)
+    by_road_type = breakdown.by_road_type().values()
+    assert sum(totals.duration for totals in by_road_type) == pytest.approx(
+        routes[0].duration
+    )
+    assert sum(totals.distance for totals in breakdown.by_toll().values()) == (
+        pytest.approx(routes[0].distance)
+    )
+
+
+@pytest.mark.parametrize("get_route_response", [GET_ROUTE_RESPONSE_COORDS])
+@pytest.mark.usefixtures("get_route_mock")
+async def test_calc_routes_builds_results_lazily():
+    """Build street names and breakdown on first access, or when detached."""
+
+    async with route_calculator.WazeRouteCalculator() as client:
+        lazy = (await client.calc_routes("50.0,8.2", "50.1,8.3"))[0]
+        detached = (await client.calc_routes("50.0,8.2", "50.1,8.3"))[0]
+        eager = (await client.calc_routes("50.0,8.2", "50.1,8.3", breakdown=True))[0]
+
+    assert lazy.geometry is not None
+    assert detached.detach() == lazy
+    lazy_breakdown = lazy.breakdown
+    eager_breakdown = eager.breakdown
+    assert lazy_breakdown is not None and eager_breakdown is not None
+    assert lazy_breakdown.segment_id == eager_breakdown.segment_id
+    assert lazy.street_names is lazy.street_names
+    assert detached.street_names == lazy.street_names
+    assert detached.breakdown is None
+    assert detached.geometry is None
+    assert lazy.detach().geometry is not None
+    assert eager.detach().breakdown is eager_breakdown
+    assert route_calculator.CalcRoutesResponse(1, 2, "name").breakdown is None
+
+
+@pytest.mark.parametrize("get_route_response", [GET_ROUTE_RESPONSE_COORDS])
+@pytest.mark.usefixtures("get_route_mock")
+async def test_calc_routes_results_are_frozen_dataclasses():
+    """Keep results immutable, hashable and usable with dataclasses helpers."""
+
+    async with route_calculator.WazeRouteCalculator() as client:
+        route = (await client.calc_routes("50.0,8.2", "50.1,8.3"))[0]
+
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        route.duration = 0  # type: ignore[misc]
+    assert hash(route) == hash(dataclasses.replace(route))
+    assert dataclasses.replace(route, duration=0).street_names == route.street_names
+    assert dataclasses.asdict(route.detach())["street_names"] == route.street_names
+    assert "_route" in {field.name for field in dataclasses.fields(route)}
+
+
+@pytest.mark.usefixtures("get_route_mock")
+@pytest.mark.parametrize("get_route_response", [GET_ALL_ROUTES_RESPONSE])
+async def test_calc_routes_detach_releases_raw_route():
+    """Retain only the compact fields of detached results."""
+
+    async with route_calculator.WazeRouteCalculator() as client:
+        tracemalloc.start()
+        try:
+            routes = await client.calc_routes("50.0,8.2", "50.1,8.3", alternatives=3)
+            count = len(routes)
+            # Let the event loop drop its handle to the finished request future.
+            await asyncio.sleep(0)
+            gc.collect()
+            retained, _ = tracemalloc.get_traced_memory()
+            for route in routes:
+                route.detach()
+            gc.collect()
+            detached, _ = tracemalloc.get_traced_memory()
+            del route, routes
+            gc.collect()
+            released, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    assert detached - released < (retained - released) / 4
+    # Results without the raw route took about 2.5 KB each.
+    assert (detached - released) / count < 2560
+
+
+@pytest.mark.parametrize("get_route_response", [GET_ROUTE_RESPONSE_COORDS])
+@pytest.mark.usefixtures("get_route_mock")
+async def test_calc_routes_geometry():
+    """Return the coordinates list of the route as its geometry."""
+
+    async with route_calculator.WazeRouteCalculator() as client:
+        routes = await client.calc_routes("50.0,8.2", "50.1,8.3", full_payload=True)
+
+    geometry = routes[0].geometry
+    assert geometry is not None
+    assert len(geometry) == len(GET_ROUTE_RESPONSE_COORDS["coords"])
+    assert next(iter(geometry)) == (50.00345516735274, 8.262364726690599)
+
+
+@pytest.mark.parametrize("partial_routes", [False, True])
+async def test_calc_routes_null_route_name(
+    respx_mock: MockRouter, partial_routes: bool
+):
+    """Return an empty name when Waze sends a null route name."""
+
+    if partial_routes:
+        pytest.importorskip("msgspec")
+    respx_mock.get(
+        "https://routing-livemap-row.waze.com/RoutingManager/routingRequest"
+    ).mock(
+        return_value=Response(
+            200,
+            json={
+                "response": {
+                    "results": [{"length": 1000, "crossTime": 60}],
+                    "routeName": None,
+                    "streetNames": None,
+                }
+            },
+        )
+    )
+    decoder = JSONDecoder(partial_routes=partial_routes)
+
+    async with route_calculator.WazeRouteCalculator(json_decoder=decoder) as client:
+        routes = await client.calc_routes("50.0,8.2", "50.1,8.3")
+
+    assert routes[0].name == ""
+    assert routes[0].street_names == ()
+
+
+@pytest.mark.parametrize(
+    ("full_payload", "expected"), ((False, "false"), (True, "true"))
+)
+async def test_calc_routes_requests_slim_payload(
+    full_payload: bool, expected: str, get_route_mock
+):
+    """Leave geometries and instructions out unless the full payload is wanted."""
+
+    async with route_calculator.WazeRouteCalculator() as client:
+        await client.calc_routes("50.0,8.2", "50.1,8.3", full_payload=full_payload)
+
+    params = get_route_mock.calls.last.request.url.params
+    assert params["returnGeometries"] == expected
+    assert params["returnInstructions"] == expected
+
+
+@pytest.mark.usefixtures("get_route_mock")
+async def test_debug_logging_summarizes_responses(caplog: pytest.LogCaptureFixture):
+    """Log a short summary per response and sample full dumps."""
+
+    caplog.set_level(logging.DEBUG, logger=route_calculator.__name__)
+
+    async with route_calculator.WazeRouteCalculator(
+        coalesce_requests=False, debug_dump_every=2
+    ) as client:
+        for _ in range(3):
+            await client.calc_routes("50.0,8.2", "50.1,8.3")
+
+    messages = [record.getMessage() for record in caplog.records]
+    summaries = [message for message in messages if "1 alternatives" in message]
+    dumps = [message for message in messages if message.startswith("Response is:")]
+    assert len(summaries) == 3
+    assert "routing-livemap-row.waze.com" in summaries[0]
+    assert "1 segments" in summaries[0]
+    assert len(dumps) == 1
+
+
+async def test_debug_logging_leaves_response_unchanged(
+    caplog: pytest.LogCaptureFixture,
+):
+    """Summarize a response without moving its coordinates into the route."""
+
+    caplog.set_level(logging.DEBUG, logger=route_calculator.__name__)
+
+    async with route_calculator.WazeRouteCalculator() as client:
+        response_json = client._check_response(
+            Response(
+                200,
+                json=GET_ROUTE_RESPONSE_COORDS,
+                request=httpx.Request("GET", ROW_ROUTING_URL),
+            )
+        )
+
+    assert response_json == GET_ROUTE_RESPONSE_COORDS
+    assert "coords" not in response_json["response"]
+    assert "1 alternatives" in caplog.records[-1].getMessage()
@@ -0,0 +1,85 @@
+"""Tests for singleflight module."""
+
+import asyncio
+
+import pytest
+from pywaze import route_calculator
+from pywaze.singleflight import SingleFlight
+
+
+async def test_single_flight_coalesces_calls():
+    """Run a single call for concurrent callers with the same key."""
+
+    flight: SingleFlight[str] = SingleFlight()
+    calls = 0
+
+    async def fetch() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0)
+        return 42
+
+    results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+
+    assert results == [42] * 5
+    assert calls == 1
+    assert (flight.calls, flight.coalesced) == (1, 4)
+    assert len(flight) == 0
+
+
+async def test_single_flight_propagates_errors():
+    """Raise the error of the shared call in every caller."""
+
+    flight: SingleFlight[str] = SingleFlight()
+
+    async def fail() -> None:
+        await asyncio.sleep(0)
+        raise route_calculator.WRCError("boom")
+
+    results = await asyncio.gather(
+        *(flight.do("key", fail) for _ in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, route_calculator.WRCError) for result in results)
+
+
+async def test_single_flight_cancelling_a_caller_keeps_the_call():
+    """Do not cancel the shared call when one caller is cancelled."""
+
+    flight: SingleFlight[str] = SingleFlight()
+    release = asyncio.Event()
+
+    async def fetch() -> str:
+        await release.wait()
+        return "done"
+
+    first = asyncio.create_task(flight.do("key", fetch))
+    second = asyncio.create_task(flight.do("key", fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    assert await second == "done"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+async def test_calc_routes_coalesces_concurrent_lookups(
+    wiesbaden_to_coords_mock, mainz_to_coords_mock, get_route_mock
+):
+    """Send one search and one routing request for identical concurrent calls."""
+
+    async with route_calculator.WazeRouteCalculator() as client:
+        await asyncio.gather(
+            *(
+                client.calc_routes(
+                    "Kaiserstraße 30 55116 Mainz, Germany",
+                    "Luisenstraße 30 65185 Wiesbaden, Germany",
+                )
+                for _ in range(10)
+            )
+        )
+
+    assert wiesbaden_to_coords_mock.call_count == 1
+    assert mainz_to_coords_mock.call_count == 1
+    assert get_route_mock.call_count == 1
@@ -0,0 +1,160 @@
+"""Tests for transport module."""
+
+import asyncio
+
+import httpx
+import pytest
+from httpx import Response
+from pywaze import route_calculator
+from pywaze.transport import PoolConfig, PoolStats, SharedTransport, default_transport
+from respx import MockRouter
+
+
+async def test_shared_transport_reuses_client_per_loop():
+    """Return the same client within an event loop."""
+
+    transport = SharedTransport()
+    client = transport.client()
+
+    assert transport.client() is client
+    await transport.aclose()
+    assert client.is_closed
+    assert transport.client() is not client
+    await transport.aclose()
+
+
+def test_shared_transport_client_per_event_loop():
+    """Create a separate client for every event loop."""
+
+    transport = SharedTransport()
+
+    assert asyncio.run(_client(transport)) is not asyncio.run(_client(transport))
+
+
+async def test_shared_transport_pool_limits_and_stats():
+    """Mount a pool with its own limits for each endpoint."""
+
+    transport = SharedTransport(routing=PoolConfig(max_connections=50))
+
+    assert transport.pools["routing"].limits().max_connections == 50
+    assert transport.stats() == {
+        "search": PoolStats(connections=0, idle_connections=0),
+        "routing": PoolStats(connections=0, idle_connections=0),
+    }
+    await transport.aclose()
+
+
+async def test_shared_transport_stats_without_pool_internals(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Leave out pools whose connections cannot be read."""
+
+    transport = SharedTransport()
+    transport.client()
+    monkeypatch.setattr(
+        transport._loop_client().transports["search"], "_pool", object()
+    )
+
+    assert set(transport.stats()) == {"routing"}
+    monkeypatch.undo()
+    await transport.aclose()
+
+
+def test_shared_transport_http2_needs_h2():
+    """Fail early when HTTP/2 is asked for without h2."""
+
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        with pytest.raises(ImportError):
+            asyncio.run(_client(SharedTransport(http2=True)))
+    else:
+        assert asyncio.run(_client(SharedTransport(http2=True))) is not None
+
+
+async def _client(transport: SharedTransport) -> httpx.AsyncClient:
+    client: httpx.AsyncClient = transport.client()
+    return client
+
+
+async def test_calculators_share_the_default_transport(
+    respx_mock: MockRouter, get_route_response
+):
+    """Use the shared client by default and leave it open on close."""
+
+    respx_mock.get(
+        "https://routing-livemap-row.waze.com/RoutingManager/routingRequest"
+    ).mock(return_value=Response(200, json=get_route_response))
+
+    for _ in range(2):
+        async with route_calculator.WazeRouteCalculator() as client:
+            await client.calc_routes("50.0,8.2", "50.1,8.3")
+            assert client.client is default_transport().client()
+
+    assert not default_transport().client().is_closed
+    await default_transport().aclose()
+
+
+async def test_calculator_closes_its_own_client():
+    """Close a client passed in."""
+
+    http_client = httpx.AsyncClient()
+    async with route_calculator.WazeRouteCalculator(client=http_client) as client:
+        assert client.client is http_client
+
+    assert http_client.is_closed
+
+
+async def test_warm_up(respx_mock: MockRouter):
+    """Send concurrent requests to the search and routing servers."""
+
+    search = respx_mock.head("https://www.waze.com/").mock(return_value=Response(200))
+    routing = respx_mock.head("https://routing-livemap-row.waze.com/").mock(
+        side_effect=[Response(404), httpx.ConnectError("refused"), Response(200)]
+    )
+
+    async with route_calculator.WazeRouteCalculator() as client:
+        assert await client.warm_up(connections=3) == 5
+
+    assert search.call_count == 3
+    assert routing.call_count == 3
+    await default_transport().aclose()
+
+
+async def test_start_warm_up(respx_mock: MockRouter):
+    """Return the task warming up the connections."""
+
+    respx_mock.head().mock(return_value=Response(200))
+
+    async with route_calculator.WazeRouteCalculator(region="US") as client:
+        task = client.start_warm_up()
+        assert isinstance(task, asyncio.Task)
+        assert await task == 4
+        assert not client._warm_up_tasks
+
+    assert respx_mock.calls.last.request.url.host in (
+        "www.waze.com",
+        "routing-livemap-am.waze.com",
+    )
+    await default_transport().aclose()
+
+
+async def test_close_cancels_every_warm_up(respx_mock: MockRouter):
+    """Cancel all warm up tasks still running on close."""
+
+    async def hang(request: httpx.Request) -> Response:
+        await asyncio.sleep(10)
+        return Response(200)
+
+    respx_mock.head().mock(side_effect=hang)
+
+    async with route_calculator.WazeRouteCalculator() as client:
+        first = client.start_warm_up()
+        second = client.start_warm_up()
+        await asyncio.sleep(0)
+
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    with pytest.raises(asyncio.CancelledError):
+        await second
+    await default_transport().aclose()